@@ -0,0 +1,191 @@
+"""
+Batch Grader - Headless grading of many submissions
+Loads problem content once and grades everything across a process pool
+"""
+
+import json
+import os
+import time
+from multiprocessing import Pool
+
+from src.core.validator import CodeValidator
+from src.core.mistake_rules import MistakeRuleRegistry
+from src.core.result_cache import ResultCache
+from src.core.results import SubmissionResult, write_binary
+from src.core.sandbox import MemoryTracker
+from src.core.similarity import MinHasher, ast_tokens, winnow
+
+
+OUTPUT_FORMATS = ('jsonl', 'binary')
+
+# Per-worker state, filled once by _init_worker
+_worker_problems = None
+_worker_validator = None
+_worker_hasher = None
+_worker_keep_code = False
+
+
+def load_problem_table(manager):
+    """
+    Collect everything needed to grade each problem in one pass
+    Returns picklable dict: problem name -> {'details': ..., 'solution_code': ...}
+    """
+    table = {}
+    for problem in manager.get_problems():
+        details = manager.get_problem_details(problem)
+        if not details:
+            continue
+        solution = manager.get_solution(problem)
+        table[details['name']] = {
+            'details': details,
+            'solution_code': solution.get('code') if solution else None
+        }
+    return table
+
+
+def read_submissions(source):
+    """
+    Yield submissions from a JSONL file or a directory
+
+    JSONL: one object per line with 'problem', 'code' and optional 'id'
+    Directory: <source>/<ProblemName>/<anything>.py, one file per submission
+
+    Yields dicts with: id, problem, code
+    """
+    if os.path.isdir(source):
+        for problem_name in sorted(os.listdir(source)):
+            problem_dir = os.path.join(source, problem_name)
+            if not os.path.isdir(problem_dir):
+                continue
+            for filename in sorted(os.listdir(problem_dir)):
+                if not filename.endswith('.py'):
+                    continue
+                with open(os.path.join(problem_dir, filename), 'r') as f:
+                    code = f.read()
+                yield {
+                    'id': f"{problem_name}/{filename}",
+                    'problem': problem_name,
+                    'code': code
+                }
+    else:
+        with open(source, 'r') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                yield {
+                    'id': data.get('id', line_number),
+                    'problem': data.get('problem', ''),
+                    'code': data.get('code', '')
+                }
+
+
+def _init_worker(problems, mistakes, isolation=None, fingerprint=False, keep_code=False):
+    """Store the problem table and a validator once per worker process"""
+    global _worker_problems, _worker_validator, _worker_hasher, _worker_keep_code
+    _worker_problems = problems
+    _worker_hasher = MinHasher() if fingerprint else None
+    _worker_keep_code = keep_code
+    # A worker grades one submission at a time on one thread, so tracemalloc sees only that run
+    MemoryTracker.exclusive = True
+    # In-memory cache: identical resubmissions in a cohort are graded once per worker
+    _worker_validator = CodeValidator(
+        mistake_rules=MistakeRuleRegistry.from_ontology(mistakes),
+        result_cache=ResultCache(cache_file=None, max_entries=5000),
+        isolation=isolation
+    )
+
+
+def _grade_submission(submission):
+    """
+    Grade one submission inside a worker and time it
+    The record is the SubmissionResult itself with id, problem and elapsed_ms added
+    """
+    start = time.perf_counter()
+    entry = _worker_problems.get(submission['problem'])
+
+    if entry is None:
+        record = SubmissionResult(valid=False, score=0, errors=[f"Unknown problem: {submission['problem']}"])
+    elif not entry['solution_code']:
+        record = SubmissionResult(valid=False, score=0, errors=["No solution available"])
+    else:
+        try:
+            record = _worker_validator.validate_with_test_cases(
+                submission['code'],
+                entry['details'],
+                entry['solution_code']
+            )
+        except Exception as e:
+            record = SubmissionResult(valid=False, score=0, errors=[f"Grader Error: {str(e)}"])
+
+    record['id'] = submission['id']
+    record['problem'] = submission['problem']
+    record['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    if _worker_hasher is not None:
+        # Fingerprinting is the costly part of indexing, so it runs in the worker
+        tokens = ast_tokens(submission['code'])
+        record['_signature'] = list(_worker_hasher.signature(winnow(tokens))) if tokens is not None else None
+    if _worker_keep_code and record.get('score', 0) < 100:
+        record['_code'] = submission['code']
+    return record
+
+
+def grade_all(problems, submissions, output, workers=None, chunksize=16, mistakes=(), isolation=None,
+              similarity_index=None, clusters=None, output_format='jsonl'):
+    """
+    Grade submissions across a process pool, streaming records to output
+
+    Args:
+        problems: Table from load_problem_table()
+        submissions: Iterable of submission dicts (see read_submissions)
+        output: Writable stream for the records (binary for output_format 'binary')
+        workers: Number of processes (defaults to CPU count)
+        chunksize: Submissions handed to a worker at a time
+        mistakes: CommonMistake dicts used to build the rule registry
+        isolation: 'fork' gives each worker a fork server for isolated runs
+        similarity_index: SimilarityIndex to add every submission to; each
+            record then lists the already indexed submissions it resembles
+        clusters: WrongAnswerClusters to count every failing submission in
+        output_format: 'jsonl' (one JSON object per line) or 'binary'
+            (length-prefixed SubmissionResult.to_bytes() records; see
+            results.read_binary)
+
+    Returns:
+        dict with: count, elapsed, throughput (submissions per second)
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    count = 0
+    start = time.perf_counter()
+
+    fingerprint = similarity_index is not None
+    initargs = (problems, list(mistakes), isolation, fingerprint, clusters is not None)
+    with Pool(processes=workers, initializer=_init_worker, initargs=initargs) as pool:
+        for record in pool.imap_unordered(_grade_submission, submissions, chunksize):
+            signature = record.pop('_signature', None)
+            if signature is not None:
+                # Regrading into an existing index must not match a submission with itself
+                record['similar'] = similarity_index.query_signature(
+                    signature, record['problem'], exclude=record['id']
+                )
+                similarity_index.add_signature(record['id'], signature, record['problem'])
+            code = record.pop('_code', None)
+            if clusters is not None and code is not None:
+                clusters.add(record['problem'], code, record, record['id'])
+            if output_format == 'binary':
+                write_binary(output, record)
+            else:
+                output.write(record.to_json() + '\n')
+            count += 1
+
+    if fingerprint:
+        similarity_index.save()
+    if clusters is not None:
+        clusters.save()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'count': count,
+        'elapsed': elapsed,
+        'throughput': count / elapsed if elapsed > 0 else 0.0
+    }
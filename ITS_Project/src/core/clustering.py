@@ -0,0 +1,114 @@
+"""
+Wrong-Answer Clusters - Group failing submissions by what they printed
+One cluster per distinct per-test output vector, with a count, a representative and mistake tags
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import threading
+
+
+def output_signature(result):
+    """
+    Hash of a graded result's per-test outcomes
+
+    Each test contributes its actual output, or its error when it crashed,
+    so submissions that fail the same way share a signature regardless of
+    how their code looks. Returns None for results without test outcomes.
+    """
+    outcomes = [
+        [r.get('passed', False), r.get('actual', ''), r.get('error') or '']
+        for r in result.get('results', [])
+    ]
+    if not outcomes:
+        return None
+    payload = json.dumps(outcomes, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class WrongAnswerClusters:
+    """Incremental clusters of failing submissions per problem, persisted as JSON"""
+
+    def __init__(self, clusters_file='wrong_answers.json'):
+        """
+        Args:
+            clusters_file: JSON file to persist to (None keeps clusters in memory only)
+        """
+        self.clusters_file = clusters_file
+        self._clusters = {}     # problem name -> {signature: cluster}
+        self._lock = threading.Lock()
+        self._load()
+
+    def add(self, problem_name, code, result, submission_id=None):
+        """
+        Count a graded submission if any of its tests failed
+
+        The first submission of a cluster becomes its representative;
+        later ones only bump the count.
+
+        Returns the cluster's signature, or None if the result was not clustered
+        """
+        if result.get('score', 0) >= 100:
+            return None
+        signature = output_signature(result)
+        if signature is None:
+            return None
+        with self._lock:
+            clusters = self._clusters.setdefault(problem_name, {})
+            cluster = clusters.get(signature)
+            if cluster is None:
+                clusters[signature] = {
+                    'signature': signature,
+                    'count': 1,
+                    'score': result.get('score', 0),
+                    'representative': code,
+                    'representative_id': submission_id,
+                    'mistakes': sorted({m['type'] for m in result.get('detected_mistakes', [])}),
+                    'outputs': [
+                        {'description': r.get('description', ''), 'actual': r.get('actual', ''), 'error': r.get('error')}
+                        for r in result.get('results', []) if not r.get('passed')
+                    ]
+                }
+            else:
+                cluster['count'] += 1
+        return signature
+
+    def top(self, problem_name, limit=10):
+        """The limit most common wrong answers for a problem, most common first"""
+        with self._lock:
+            clusters = list(self._clusters.get(problem_name, {}).values())
+        return [dict(c) for c in heapq.nlargest(limit, clusters, key=lambda c: c['count'])]
+
+    def problems(self):
+        """Names of problems with at least one cluster"""
+        with self._lock:
+            return sorted(self._clusters)
+
+    def clear(self, problem_name):
+        """Forget a problem's clusters (e.g. after its tests changed)"""
+        with self._lock:
+            self._clusters.pop(problem_name, None)
+
+    def _load(self):
+        """Load clusters from file"""
+        if not self.clusters_file or not os.path.exists(self.clusters_file):
+            return
+        try:
+            with open(self.clusters_file, 'r') as f:
+                self._clusters = json.load(f)
+        except Exception as e:
+            print(f"Error loading wrong-answer clusters: {e}")
+
+    def save(self):
+        """Save clusters to file"""
+        if not self.clusters_file:
+            return
+        with self._lock:
+            payload = json.dumps(self._clusters)
+        try:
+            with open(self.clusters_file, 'w') as f:
+                f.write(payload)
+        except Exception as e:
+            print(f"Error saving wrong-answer clusters: {e}")
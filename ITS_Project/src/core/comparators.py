@@ -0,0 +1,153 @@
+"""
+Output Comparators - Streaming comparison of program output
+Walks expected and actual output line by line and stops at the first difference
+"""
+
+import math
+from collections import Counter
+from itertools import zip_longest
+
+
+DEFAULT_POLICY = 'exact'
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+
+
+def iter_lines(source):
+    """
+    Lazily yield stripped lines, ignoring leading and trailing blank lines
+
+    Matches the old [line.strip() for line in text.strip().split('\\n')]
+    normalization without building the list. source may be a string or any
+    iterable of lines (str or bytes), e.g. an open file or memory map.
+    """
+    if isinstance(source, str):
+        source = _split_lines(source)
+
+    started = False
+    pending_blanks = 0
+    for line in source:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        line = line.strip()
+        if not line:
+            if started:
+                pending_blanks += 1
+            continue
+        started = True
+        for _ in range(pending_blanks):
+            yield ''
+        pending_blanks = 0
+        yield line
+
+
+def _split_lines(text):
+    """Yield the lines of text one at a time without splitting it up front"""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def _exact(expected, actual, arg):
+    """Lines equal after stripping"""
+    return expected == actual
+
+
+def _whitespace(expected, actual, arg):
+    """Lines equal ignoring all runs of whitespace"""
+    return expected.split() == actual.split()
+
+
+def _float(expected, actual, arg):
+    """Lines equal with numeric tokens compared within a tolerance"""
+    tolerance = float(arg) if arg else DEFAULT_FLOAT_TOLERANCE
+    expected_tokens = expected.split()
+    actual_tokens = actual.split()
+    if len(expected_tokens) != len(actual_tokens):
+        return False
+    for e, a in zip(expected_tokens, actual_tokens):
+        if e == a:
+            continue
+        try:
+            if not math.isclose(float(e), float(a), rel_tol=tolerance, abs_tol=tolerance):
+                return False
+        except ValueError:
+            return False
+    return True
+
+
+# Line-by-line policies: name -> line equality function
+LINE_POLICIES = {
+    'exact': _exact,
+    'whitespace': _whitespace,
+    'float': _float
+}
+
+
+def parse_policy(policy):
+    """Split a policy spec like 'float:1e-3' into (name, argument)"""
+    if not policy:
+        return DEFAULT_POLICY, None
+    name, _, arg = policy.partition(':')
+    return name.strip().lower(), arg.strip() or None
+
+
+def validate_policy(policy):
+    """
+    Check a policy spec like 'float:1e-3'
+    Unknown names and malformed tolerances raise ValueError.
+    """
+    name, arg = parse_policy(policy)
+    if name not in LINE_POLICIES and name != 'unordered':
+        raise ValueError(f"Unknown comparison policy: {name}")
+    if arg is not None:
+        if name != 'float':
+            raise ValueError(f"Comparison policy '{name}' takes no argument")
+        try:
+            float(arg)
+        except ValueError:
+            raise ValueError(f"Invalid float tolerance: {arg}") from None
+
+
+def compare_outputs(expected, actual, policy=DEFAULT_POLICY):
+    """
+    Compare two outputs lazily
+
+    Args:
+        expected: Expected output (string or iterable of lines)
+        actual: Program output (string or iterable of lines)
+        policy: 'exact', 'whitespace', 'float[:tolerance]' or 'unordered'
+
+    Returns:
+        (matched, first_diff_line) where first_diff_line is the 1-based line
+        of the first difference, or None when the outputs match
+    """
+    name, arg = parse_policy(policy)
+
+    if name == 'unordered':
+        return _compare_unordered(expected, actual)
+
+    lines_equal = LINE_POLICIES.get(name, _exact)
+    missing = object()
+    pairs = zip_longest(iter_lines(expected), iter_lines(actual), fillvalue=missing)
+    for line_number, (e, a) in enumerate(pairs, start=1):
+        if e is missing or a is missing or not lines_equal(e, a, arg):
+            return False, line_number
+    return True, None
+
+
+def _compare_unordered(expected, actual):
+    """Same lines in any order; reports the first actual line with no match left"""
+    remaining = Counter(iter_lines(expected))
+    line_number = 0
+    for line_number, line in enumerate(iter_lines(actual), start=1):
+        if remaining[line] <= 0:
+            return False, line_number
+        remaining[line] -= 1
+    if any(count > 0 for count in remaining.values()):
+        return False, line_number + 1
+    return True, None
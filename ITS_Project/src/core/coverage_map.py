@@ -0,0 +1,246 @@
+"""
+Coverage Map - Which lines and branches of student code ran
+Filled by ExecutionMonitor during a run and merged across test cases into one report
+"""
+
+import dis
+from collections import namedtuple
+
+
+# A conditional jump: outcome 'next' falls through, 'jump' goes to the target.
+# key (qualname, line, index on that line) is stable across recompiles and
+# across the blanked-out lines of stripped inputs.
+BranchPoint = namedtuple('BranchPoint', 'key kind offset next_offset next_line jump_line')
+
+_BRANCH_OPNAMES = {'FOR_ITER', 'JUMP_IF_TRUE_OR_POP', 'JUMP_IF_FALSE_OR_POP'}
+
+_UNCONDITIONAL_JUMPS = {
+    'JUMP_FORWARD', 'JUMP_BACKWARD', 'JUMP_ABSOLUTE', 'JUMP', 'JUMP_NO_INTERRUPT',
+    'JUMP_BACKWARD_NO_INTERRUPT'
+}
+
+
+def _is_branch(instruction):
+    """Conditional jumps and loop heads"""
+    name = instruction.opname
+    return name in _BRANCH_OPNAMES or (name.startswith('POP_JUMP') and '_IF_' in name)
+
+
+def _instruction_lines(instructions):
+    """
+    Source line of every instruction, by offset
+    None for compiler-generated instructions (e.g. a loop's closing jump),
+    which never report a line event.
+    """
+    lines = {}
+    line = None
+    for instruction in instructions:
+        positions = getattr(instruction, 'positions', None)
+        if positions is not None:
+            line = positions.lineno
+        elif instruction.starts_line:
+            line = instruction.starts_line
+        lines[instruction.offset] = line
+    return lines
+
+
+def _landing_line(instructions, lines, positions, position, line):
+    """
+    First line other than line reached running on from instructions[position]
+    Unconditional jumps are followed to their target, so a branch that skips
+    to a loop's closing jump lands on the loop head, as the line events do.
+    """
+    seen = set()
+    while position is not None and position < len(instructions) and position not in seen:
+        seen.add(position)
+        instruction = instructions[position]
+        landing = lines[instruction.offset]
+        if landing is not None and landing != line:
+            return landing
+        if instruction.opname in _UNCONDITIONAL_JUMPS:
+            position = positions.get(instruction.argval)
+        else:
+            position += 1
+    return None
+
+
+def branch_points(code):
+    """BranchPoints of one code object (not its nested code objects)"""
+    instructions = list(dis.get_instructions(code))
+    lines = _instruction_lines(instructions)
+    positions = {instruction.offset: position for position, instruction in enumerate(instructions)}
+    points = []
+    per_line = {}
+    line = None
+    for position, instruction in enumerate(instructions):
+        line = lines[instruction.offset] or line
+        if not _is_branch(instruction):
+            continue
+        index = per_line.get(line, 0)
+        per_line[line] = index + 1
+        next_offset = instructions[position + 1].offset if position + 1 < len(instructions) else None
+        target = positions.get(instruction.argval)
+        points.append(BranchPoint(
+            key=(code.co_qualname if hasattr(code, 'co_qualname') else code.co_name, line, index),
+            kind='loop' if instruction.opname == 'FOR_ITER' else 'condition',
+            offset=instruction.offset,
+            next_offset=next_offset,
+            next_line=_landing_line(instructions, lines, positions, position + 1, line),
+            jump_line=_landing_line(instructions, lines, positions, target, line) if target is not None else None
+        ))
+    return points
+
+
+def trackable_outcomes(point):
+    """
+    Outcomes visible from line events alone (the settrace fallback)
+
+    An outcome shows up as the next line run after the branch's line, so
+    it must land on a different line than the branch and the other outcome.
+    """
+    line = point.key[1]
+    outcomes = []
+    if point.next_line not in (None, line) and point.next_line != point.jump_line:
+        outcomes.append('next')
+    if point.jump_line not in (None, line) and point.jump_line != point.next_line:
+        outcomes.append('jump')
+    return outcomes
+
+
+def _walk(code):
+    """A code object and every code object nested in it"""
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, type(code)):
+            yield from _walk(const)
+
+
+class CoverageData:
+    """
+    Lines and branch outcomes seen during runs
+
+    mode 'branch' records sys.monitoring BRANCH events; mode 'arc' infers
+    outcomes from consecutive line events of a frame (Python < 3.12).
+    """
+
+    def __init__(self, mode='branch'):
+        self.mode = mode
+        self.lines = set()
+        self.branches = set()       # (key, outcome)
+        self._points = {}           # code object -> {offset: BranchPoint}
+        self._arcs = {}             # code object -> {line: {landing line: outcomes}}
+        self._pending = {}          # frame -> landings of its previous line (arc mode)
+
+    def _offsets(self, code):
+        points = self._points.get(code)
+        if points is None:
+            points = self._points[code] = {p.offset: p for p in branch_points(code)}
+        return points
+
+    def on_line(self, lineno):
+        self.lines.add(lineno)
+
+    def on_branch(self, code, source, destination):
+        """A BRANCH event: the jump at source continued at destination"""
+        point = self._offsets(code).get(source)
+        if point is not None:
+            self.branches.add((point.key, 'next' if destination == point.next_offset else 'jump'))
+
+    def _landings(self, code):
+        """Per branch line of code: {landing line: ((key, outcome), ...)}"""
+        by_line = self._arcs[code] = {}
+        for point in self._offsets(code).values():
+            landings = by_line.setdefault(point.key[1], {})
+            for outcome in trackable_outcomes(point):
+                landing = point.next_line if outcome == 'next' else point.jump_line
+                landings[landing] = landings.get(landing, ()) + ((point.key, outcome),)
+        return by_line
+
+    def on_frame_line(self, frame, lineno):
+        """
+        A line event in arc mode
+        Resolves the branches of the frame's previous line, if it had any;
+        lines without branches cost two dict lookups.
+        """
+        pending = self._pending.pop(frame, None)
+        if pending is not None:
+            outcomes = pending.get(lineno)
+            if outcomes is not None:
+                self.branches.update(outcomes)
+        code = frame.f_code
+        by_line = self._arcs.get(code)
+        if by_line is None:
+            by_line = self._landings(code)
+        landings = by_line.get(lineno)
+        if landings is not None:
+            self._pending[frame] = landings
+
+    def on_frame_exit(self, frame):
+        self._pending.pop(frame, None)
+
+    def to_dict(self):
+        """JSON-friendly form for a test result"""
+        return {
+            'mode': self.mode,
+            'lines': sorted(self.lines),
+            'branches': sorted([list(key), outcome] for key, outcome in self.branches)
+        }
+
+
+def coverage_report(code, runs):
+    """
+    Merge per-test coverage (CoverageData.to_dict() values) into one report
+
+    Returns dict with: executed_lines, missing_lines, line_rate (percent),
+    branches_total, branches_covered, branch_rate (percent, or None without
+    branches), partial_branches (list of {line, kind, message}); or None if
+    code does not compile or there are no runs
+    """
+    runs = [run for run in runs if run]
+    if not runs:
+        return None
+    try:
+        root = compile(code, '<student>', 'exec')
+    except (SyntaxError, ValueError):
+        return None
+
+    executable = set()
+    points = []
+    for nested in _walk(root):
+        executable.update(line for _, _, line in nested.co_lines() if line)
+        points.extend(branch_points(nested))
+
+    executed = set()
+    outcomes = set()
+    for run in runs:
+        executed.update(run['lines'])
+        outcomes.update((tuple(key), outcome) for key, outcome in run['branches'])
+    arc_mode = any(run['mode'] == 'arc' for run in runs)
+
+    total = covered = 0
+    partial = []
+    for point in points:
+        expected = trackable_outcomes(point) if arc_mode else ['next', 'jump']
+        seen = [outcome for outcome in expected if (point.key, outcome) in outcomes]
+        total += len(expected)
+        covered += len(seen)
+        line = point.key[1]
+        if len(seen) < len(expected) and line in executed:
+            missing = next(outcome for outcome in expected if outcome not in seen)
+            if point.kind == 'loop':
+                message = (f"The loop on line {line} never ran its body" if missing == 'next'
+                           else f"The loop on line {line} never finished")
+            else:
+                message = f"The condition on line {line} went the same way in every test"
+            partial.append({'line': line, 'kind': point.kind, 'message': message})
+
+    executed &= executable
+    return {
+        'executed_lines': sorted(executed),
+        'missing_lines': sorted(executable - executed),
+        'line_rate': int(len(executed) / len(executable) * 100) if executable else 100,
+        'branches_total': total,
+        'branches_covered': covered,
+        'branch_rate': int(covered / total * 100) if total else None,
+        'partial_branches': sorted(partial, key=lambda p: p['line'])
+    }
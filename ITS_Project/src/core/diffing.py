@@ -0,0 +1,235 @@
+"""
+Output Diffing - Where a failing test's output diverges from the expected output
+Bounded line-level diff: a fast path for one changed line, difflib for small
+outputs and a linear positional fallback for huge ones
+"""
+
+import difflib
+from collections import Counter
+from itertools import islice, zip_longest
+
+from src.core.comparators import iter_lines, parse_policy, LINE_POLICIES, DEFAULT_POLICY
+
+
+# Lines read from each side; the rest is ignored and the diff marked truncated
+MAX_DIFF_INPUT_LINES = 5000
+
+# Largest (expected x actual) block handed to difflib, which is quadratic
+MAX_DIFF_CELLS = 250_000
+
+# Entries in a returned diff, including context and skip markers
+MAX_DIFF_ENTRIES = 60
+
+# Unchanged lines shown around each change
+CONTEXT_LINES = 2
+
+# Characters kept of each displayed line
+MAX_LINE_CHARS = 120
+
+
+def _clip(line):
+    """Shorten a line for display"""
+    if line is not None and len(line) > MAX_LINE_CHARS:
+        return line[:MAX_LINE_CHARS] + "..."
+    return line
+
+
+def _first_difference(expected, actual):
+    """1-based column of the first differing character"""
+    for column, (e, a) in enumerate(zip(expected, actual), start=1):
+        if e != a:
+            return column
+    return min(len(expected), len(actual)) + 1
+
+
+def _read_lines(source):
+    """Up to MAX_DIFF_INPUT_LINES normalized lines, and whether more were left"""
+    lines = list(islice(iter_lines(source), MAX_DIFF_INPUT_LINES + 1))
+    return lines[:MAX_DIFF_INPUT_LINES], len(lines) > MAX_DIFF_INPUT_LINES
+
+
+# Line keys difflib matches on, for policies whose equal lines share a canonical form
+_LINE_KEYS = {
+    'whitespace': lambda line: ' '.join(line.split())
+}
+
+
+def _opcodes(expected, actual, start, e_end, a_end, key=None):
+    """Change opcodes for the differing middle block (e[start:e_end] vs a[start:a_end])"""
+    e_count = e_end - start
+    a_count = a_end - start
+    if e_count * a_count <= MAX_DIFF_CELLS:
+        e_block, a_block = expected[start:e_end], actual[start:a_end]
+        if key is not None:
+            e_block, a_block = list(map(key, e_block)), list(map(key, a_block))
+        matcher = difflib.SequenceMatcher(None, e_block, a_block, autojunk=False)
+        return 'full', [
+            (tag, i1 + start, i2 + start, j1 + start, j2 + start)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        ]
+
+    # Too big for difflib: line up the blocks position by position
+    opcodes = []
+    common = min(e_count, a_count)
+    if common:
+        opcodes.append(('replace', start, start + common, start, start + common))
+    if e_count > common:
+        opcodes.append(('delete', start + common, e_end, a_end, a_end))
+    if a_count > common:
+        opcodes.append(('insert', e_end, e_end, start + common, a_end))
+    return 'positional', opcodes
+
+
+def _change_entries(tag, expected, actual, i1, i2, j1, j2, same):
+    """Entries for one non-equal opcode (same tells whether two lines match)"""
+    entries = []
+    if tag == 'replace':
+        for (i, e), (j, a) in zip_longest(
+            zip(range(i1, i2), expected[i1:i2]), zip(range(j1, j2), actual[j1:j2]),
+            fillvalue=(None, None)
+        ):
+            if e is not None and a is not None:
+                if same(e, a):
+                    entries.append({'op': 'equal', 'expected_line': i + 1, 'actual_line': j + 1,
+                                    'expected': _clip(e), 'actual': _clip(a)})
+                else:
+                    entries.append({'op': 'changed', 'expected_line': i + 1, 'actual_line': j + 1,
+                                    'expected': _clip(e), 'actual': _clip(a),
+                                    'column': _first_difference(e, a)})
+            elif e is not None:
+                entries.append({'op': 'missing', 'expected_line': i + 1, 'actual_line': None,
+                                'expected': _clip(e), 'actual': None})
+            else:
+                entries.append({'op': 'extra', 'expected_line': None, 'actual_line': j + 1,
+                                'expected': None, 'actual': _clip(a)})
+    elif tag == 'delete':
+        for i in range(i1, i2):
+            entries.append({'op': 'missing', 'expected_line': i + 1, 'actual_line': None,
+                            'expected': _clip(expected[i]), 'actual': None})
+    elif tag == 'insert':
+        for j in range(j1, j2):
+            entries.append({'op': 'extra', 'expected_line': None, 'actual_line': j + 1,
+                            'expected': None, 'actual': _clip(actual[j])})
+    return entries
+
+
+def _context_entries(expected, actual, i1, i2, j1, i_first, i_last):
+    """Equal lines kept around changes, with a skip marker for the rest"""
+    count = i2 - i1
+    head = min(count, CONTEXT_LINES) if not i_first else 0
+    tail = min(count - head, CONTEXT_LINES) if not i_last else 0
+    if count - head - tail == 1:
+        tail += 1   # a marker would take as much room as the line
+    entries = []
+
+    def equal(offset):
+        return {'op': 'equal', 'expected_line': i1 + offset + 1, 'actual_line': j1 + offset + 1,
+                'expected': _clip(expected[i1 + offset]), 'actual': _clip(actual[j1 + offset])}
+
+    for offset in range(head):
+        entries.append(equal(offset))
+    skipped = count - head - tail
+    if skipped > 0:
+        entries.append({'op': 'skip', 'count': skipped})
+    for offset in range(count - tail, count):
+        entries.append(equal(offset))
+    return entries
+
+
+def _unordered_diff(expected_lines, actual_lines, truncated):
+    """Lines missing from or extra in actual, ignoring order"""
+    remaining = Counter(actual_lines)
+    missing = []
+    for i, line in enumerate(expected_lines):
+        if remaining[line] > 0:
+            remaining[line] -= 1
+        else:
+            missing.append({'op': 'missing', 'expected_line': i + 1, 'actual_line': None,
+                            'expected': _clip(line), 'actual': None})
+    unmatched = Counter(expected_lines)
+    extra = []
+    for j, line in enumerate(actual_lines):
+        if unmatched[line] > 0:
+            unmatched[line] -= 1
+        else:
+            extra.append({'op': 'extra', 'expected_line': None, 'actual_line': j + 1,
+                          'expected': None, 'actual': _clip(line)})
+    entries = missing + extra
+    if not entries:
+        return {'method': 'none', 'entries': [], 'truncated': truncated}
+    if len(entries) > MAX_DIFF_ENTRIES:
+        entries = entries[:MAX_DIFF_ENTRIES]
+        truncated = True
+    return {'method': 'unordered', 'entries': entries, 'truncated': truncated}
+
+
+def diff_outputs(expected, actual, policy=DEFAULT_POLICY):
+    """
+    Line-level diff of expected against actual output
+
+    Lines are normalized like the comparators (stripped, outer blank lines
+    ignored) and matched with the comparison policy's line equality, so
+    lines the policy accepts never show as changed; for 'unordered' the
+    diff lists the lines missing or extra in any order. At most
+    MAX_DIFF_INPUT_LINES lines of each side are read and at most
+    MAX_DIFF_ENTRIES entries returned.
+
+    Returns dict with:
+        method: 'none' (no difference), 'single' (one changed line),
+            'full' (difflib), 'positional' (linear fallback) or
+            'unordered' (missing and extra lines)
+        entries: dicts with op ('equal', 'changed', 'missing', 'extra' or
+            'skip'), expected_line, actual_line, expected, actual, plus
+            column (first differing character) for 'changed' and count for 'skip'
+        truncated: True when input or entries were cut off
+    """
+    expected_lines, expected_cut = _read_lines(expected)
+    actual_lines, actual_cut = _read_lines(actual)
+    truncated = expected_cut or actual_cut
+
+    name, arg = parse_policy(policy)
+    if name == 'unordered':
+        return _unordered_diff(expected_lines, actual_lines, truncated)
+    lines_equal = LINE_POLICIES.get(name, LINE_POLICIES[DEFAULT_POLICY])
+
+    def same(e, a):
+        return lines_equal(e, a, arg)
+
+    # Common prefix and suffix in linear time
+    start = 0
+    limit = min(len(expected_lines), len(actual_lines))
+    while start < limit and same(expected_lines[start], actual_lines[start]):
+        start += 1
+    e_end, a_end = len(expected_lines), len(actual_lines)
+    while e_end > start and a_end > start and same(expected_lines[e_end - 1], actual_lines[a_end - 1]):
+        e_end -= 1
+        a_end -= 1
+
+    if start == e_end and start == a_end:
+        return {'method': 'none', 'entries': [], 'truncated': truncated}
+
+    if e_end - start == 1 and a_end - start == 1:
+        method, opcodes = 'single', [('replace', start, e_end, start, a_end)]
+    else:
+        method, opcodes = _opcodes(expected_lines, actual_lines, start, e_end, a_end, _LINE_KEYS.get(name))
+
+    # Surround the changed block with its unchanged prefix and suffix
+    if start:
+        opcodes.insert(0, ('equal', 0, start, 0, start))
+    if e_end < len(expected_lines):
+        opcodes.append(('equal', e_end, len(expected_lines), a_end, len(actual_lines)))
+
+    entries = []
+    for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == 'equal':
+            entries.extend(_context_entries(
+                expected_lines, actual_lines, i1, i2, j1, index == 0, index == len(opcodes) - 1
+            ))
+        else:
+            entries.extend(_change_entries(tag, expected_lines, actual_lines, i1, i2, j1, j2, same))
+        if len(entries) > MAX_DIFF_ENTRIES:
+            entries = entries[:MAX_DIFF_ENTRIES]
+            truncated = True
+            break
+
+    return {'method': method, 'entries': entries, 'truncated': truncated}
@@ -0,0 +1,319 @@
+"""
+Fork Server - Process-isolated executions from a pre-warmed interpreter
+One server process imports the sandbox once, then fork()s a copy-on-write child per execution
+"""
+
+import gc
+import os
+import pickle
+import signal
+import struct
+import subprocess
+import sys
+import threading
+
+from src.core.sandbox import (
+    OutputLimitExceeded, ExecutionBudgetExceeded, MemoryLimitExceeded, MemoryTracker, ExecutionMonitor,
+    CappedOutput, DiscardOutput, InputFeeder, execution_context,
+    DEFAULT_MAX_OUTPUT_BYTES, DEFAULT_MAX_OUTPUT_LINES, DEFAULT_MAX_STEPS
+)
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_CPU_SECONDS = 5
+DEFAULT_MEMORY_BYTES = 512 * 1024 * 1024
+
+_HEADER = struct.Struct('!I')
+
+
+class ForkServer:
+    """
+    Runs each execution in a forked child of a long-lived, pre-warmed server
+
+    The server imports the validator, builds its sandbox once and freezes
+    the heap; every execution is a fork() with CPU, memory and file-size
+    rlimits applied in the child, and the result comes back over a pipe.
+    Requests to one server run one at a time; use one server per thread
+    for concurrent executions. POSIX only (see available()).
+    """
+
+    def __init__(self, max_steps=DEFAULT_MAX_STEPS, max_output_bytes=DEFAULT_MAX_OUTPUT_BYTES,
+                 max_output_lines=DEFAULT_MAX_OUTPUT_LINES, cpu_seconds=DEFAULT_CPU_SECONDS,
+                 memory_bytes=DEFAULT_MEMORY_BYTES):
+        self.config = {
+            'max_steps': max_steps,
+            'max_output_bytes': max_output_bytes,
+            'max_output_lines': max_output_lines,
+            'cpu_seconds': cpu_seconds,
+            'memory_bytes': memory_bytes
+        }
+        self._process = None
+        self._request = None
+        self._response = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        """Check if fork() and rlimits exist on this platform"""
+        try:
+            import resource  # noqa: F401
+        except ImportError:
+            return False
+        return hasattr(os, 'fork')
+
+    @staticmethod
+    def supports(monitor=None, stdin=None, sink=None):
+        """
+        Whether execute() can run this in a child
+        Step counting, DiscardOutput and fresh CappedOutputs (their caps are
+        sent along) are supported; profiles, coverage, InputFeeders and
+        other sinks only exist in this process.
+        """
+        if monitor is not None and (monitor.profile is not None or monitor.coverage is not None):
+            return False
+        if isinstance(sink, CappedOutput):
+            return sink.bytes_written == 0
+        if sink is not None and not isinstance(sink, DiscardOutput):
+            return False
+        return not isinstance(stdin, InputFeeder)
+
+    def start(self):
+        """Launch the server process and send it the sandbox configuration"""
+        if self._process is not None:
+            return self
+        if not self.available():
+            raise RuntimeError("Fork server needs a POSIX system with fork()")
+
+        request_r, request_w = os.pipe()
+        response_r, response_w = os.pipe()
+        env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+        self._process = subprocess.Popen(
+            [sys.executable, '-m', 'src.core.fork_server', str(request_r), str(response_w)],
+            pass_fds=(request_r, response_w),
+            cwd=PROJECT_ROOT,
+            env=env
+        )
+        os.close(request_r)
+        os.close(response_w)
+        self._request = os.fdopen(request_w, 'wb')
+        self._response = os.fdopen(response_r, 'rb')
+        _write_message(self._request, self.config)
+        return self
+
+    def execute(self, code, setup=None, memory=None, stdin=None, stdin_file=None, entry_function=None,
+                monitor=None, sink=None):
+        """
+        Execute code in a fresh child and return its output
+        Raises the same errors as CodeValidator._execute_code; memory is a
+        MemoryTracker whose limit applies in the child and whose peak is
+        filled in. stdin must be a string (feeders stay in this process);
+        stdin_file is a path the child memory-maps itself. With
+        entry_function the child loads code as a module and calls that
+        function with the names setup assigns (see FunctionHarness.call).
+        monitor is an ExecutionMonitor whose step budget applies in the
+        child and whose steps are filled in; sink may be a DiscardOutput or
+        an empty CappedOutput whose caps replace the defaults (see supports()).
+        """
+        if not self.supports(monitor, stdin, sink):
+            raise ValueError("Profiled, covered or fed runs cannot leave this process")
+        request = {
+            'code': code,
+            'setup': setup,
+            'stdin': stdin,
+            'stdin_file': stdin_file,
+            'entry_function': entry_function,
+            'count_steps': monitor is not None,
+            'max_steps': monitor.max_steps if monitor is not None else None,
+            'discard_output': isinstance(sink, DiscardOutput),
+            'output_caps': (sink.max_bytes, sink.max_lines) if isinstance(sink, CappedOutput) else None,
+            'measure_memory': memory is not None,
+            'memory_limit': memory.limit if memory is not None else None,
+            'context': execution_context.get()
+        }
+        with self._lock:
+            if self._process is None:
+                self.start()
+            _write_message(self._request, request)
+            reply = _read_message(self._response)
+
+        if reply is None:
+            raise RuntimeError("Fork server stopped unexpectedly")
+
+        if memory is not None:
+            memory.peak = reply.get('memory_peak')
+        if monitor is not None:
+            monitor.steps = reply.get('steps') or 0
+        kind = reply['kind']
+        if kind == 'ok':
+            return reply['output']
+        if kind == 'output_limit':
+            raise OutputLimitExceeded(reply['message'], reply['output'])
+        if kind == 'budget':
+            raise ExecutionBudgetExceeded(reply['message'])
+        if kind == 'memory':
+            raise MemoryLimitExceeded(reply['message'])
+        raise Exception(reply['message'])
+
+    def close(self):
+        """Stop the server process"""
+        if self._process is None:
+            return
+        try:
+            self._request.close()
+            self._response.close()
+        finally:
+            self._process.wait(timeout=5)
+            self._process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RemoteHarness:
+    """
+    FunctionHarness stand-in whose calls run in fork server children
+
+    The module is loaded afresh in each child, so no student code runs in
+    this process; globals do not carry over between calls.
+    """
+
+    def __init__(self, server, code, function_name):
+        self.server = server
+        self.code = code
+        self.function_name = function_name
+        self.module_output = ''
+        self.error = None
+        self.load_coverage = None
+
+    def call(self, setup='', monitor=None, memory=None, sink=None):
+        """Call the entry function in a child (see FunctionHarness.call)"""
+        return self.server.execute(
+            self.code, setup, memory, entry_function=self.function_name, monitor=monitor, sink=sink
+        )
+
+
+def _write_message(stream, message):
+    """Send one length-prefixed pickle"""
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(_HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def _read_message(stream):
+    """Receive one length-prefixed pickle, or None at end of stream"""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (length,) = _HEADER.unpack(header)
+    return pickle.loads(stream.read(length))
+
+
+def _describe_exit(status):
+    """Explain a child that died without replying"""
+    if os.WIFSIGNALED(status):
+        signum = os.WTERMSIG(status)
+        if signum == signal.SIGXCPU:
+            return "Time Limit Exceeded: CPU time limit reached"
+        if signum == signal.SIGXFSZ:
+            return "Runtime Error: file size limit reached"
+        return f"Runtime Error: process killed by signal {signal.Signals(signum).name}"
+    return f"Runtime Error: process exited with status {os.WEXITSTATUS(status)}"
+
+
+def _run_child(validator, request, config, reply_fd):
+    """Inside the forked child: apply limits, execute, report, exit"""
+    import resource
+
+    cpu = config['cpu_seconds']
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (config['memory_bytes'], config['memory_bytes']))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+
+    # This process runs nothing else, so tracemalloc sees only the student's allocations
+    MemoryTracker.exclusive = True
+    memory = MemoryTracker(request['memory_limit']) if request['measure_memory'] else None
+    monitor = None
+    if request['count_steps']:
+        monitor = ExecutionMonitor(request['max_steps'], count=True, memory=memory)
+    sink = None
+    if request['discard_output']:
+        sink = DiscardOutput()
+    elif request['output_caps'] is not None:
+        sink = CappedOutput(*request['output_caps'])
+    execution_context.set(request['context'])
+    try:
+        if request['entry_function']:
+            harness = validator._harness(request['code'], request['entry_function'])
+            output = harness.call(request['setup'] or '', monitor=monitor, memory=memory, sink=sink)
+        else:
+            output = validator._execute_code(
+                request['code'], setup=request['setup'], monitor=monitor, sink=sink, memory=memory,
+                stdin=request['stdin'], stdin_file=request['stdin_file']
+            )
+        reply = {'kind': 'ok', 'output': output}
+    except OutputLimitExceeded as e:
+        reply = {'kind': 'output_limit', 'message': str(e), 'output': e.output}
+    except ExecutionBudgetExceeded as e:
+        reply = {'kind': 'budget', 'message': str(e)}
+    except MemoryLimitExceeded as e:
+        reply = {'kind': 'memory', 'message': str(e)}
+    except MemoryError:
+        # The process address-space rlimit, not the problem's memory limit
+        reply = {'kind': 'error', 'message': "Memory Error: process limit reached"}
+    except BaseException as e:
+        reply = {'kind': 'error', 'message': str(e)}
+
+    reply['memory_peak'] = memory.peak if memory is not None else None
+    reply['steps'] = monitor.steps if monitor is not None else None
+    with os.fdopen(reply_fd, 'wb') as stream:
+        _write_message(stream, reply)
+    os._exit(0)
+
+
+def serve(request_fd, response_fd):
+    """Server loop: one fork per request until the client closes the pipe"""
+    from src.core.validator import CodeValidator
+
+    requests = os.fdopen(request_fd, 'rb')
+    responses = os.fdopen(response_fd, 'wb')
+
+    config = _read_message(requests)
+    if config is None:
+        return
+    validator = CodeValidator(
+        max_steps=config['max_steps'],
+        max_output_bytes=config['max_output_bytes'],
+        max_output_lines=config['max_output_lines']
+    )
+    # Warm the sandbox once, then keep the heap out of the collector so
+    # children share its pages copy-on-write
+    validator._execute_code("pass")
+    gc.freeze()
+
+    while True:
+        request = _read_message(requests)
+        if request is None:
+            break
+
+        reply_r, reply_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(reply_r)
+            _run_child(validator, request, config, reply_w)
+
+        os.close(reply_w)
+        with os.fdopen(reply_r, 'rb') as stream:
+            reply = _read_message(stream)
+        _, status = os.waitpid(pid, 0)
+
+        if reply is None:
+            reply = {'kind': 'error', 'message': _describe_exit(status)}
+        _write_message(responses, reply)
+
+
+if __name__ == '__main__':
+    serve(int(sys.argv[1]), int(sys.argv[2]))
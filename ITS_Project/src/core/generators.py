@@ -0,0 +1,96 @@
+"""
+Input Generators - Seeded random test inputs from ontology specs
+Turns a JSON spec of input variables into reproducible setup code
+"""
+
+import json
+import random
+import string
+
+
+DEFAULT_CASES = 5
+DEFAULT_SEED = 0
+
+# How many times to retry a duplicate dict key before giving up on the size
+MAX_KEY_ATTEMPTS = 50
+
+
+def parse_generator(text):
+    """
+    Parse an inputGenerator spec
+
+    Example:
+        {"cases": 5, "seed": 1,
+         "variables": {"numbers": {"type": "list", "items": {"type": "int"}, "max_len": 8}}}
+
+    Returns the spec dict, or None if text is empty
+    Raises ValueError for malformed JSON or a spec without variables
+    """
+    if not text:
+        return None
+    spec = json.loads(text)
+    if not isinstance(spec, dict) or not isinstance(spec.get('variables'), dict):
+        raise ValueError("inputGenerator needs a 'variables' object")
+    return spec
+
+
+def generate_value(spec, rng):
+    """
+    Draw one value from a variable spec
+
+    Types: int (min, max), float (min, max, digits), str (alphabet, min_len,
+    max_len), list (items, min_len, max_len), dict (keys, values, min_len,
+    max_len) and choice (options)
+    """
+    kind = spec.get('type', 'int')
+
+    if kind == 'int':
+        return rng.randint(spec.get('min', -100), spec.get('max', 100))
+
+    if kind == 'float':
+        value = rng.uniform(spec.get('min', 0.0), spec.get('max', 100.0))
+        return round(value, spec.get('digits', 2))
+
+    if kind == 'str':
+        alphabet = spec.get('alphabet', string.ascii_lowercase)
+        length = rng.randint(spec.get('min_len', 1), spec.get('max_len', 8))
+        return ''.join(rng.choice(alphabet) for _ in range(length))
+
+    if kind == 'list':
+        length = rng.randint(spec.get('min_len', 0), spec.get('max_len', 8))
+        items = spec.get('items', {'type': 'int'})
+        return [generate_value(items, rng) for _ in range(length)]
+
+    if kind == 'dict':
+        length = rng.randint(spec.get('min_len', 1), spec.get('max_len', 5))
+        keys = spec.get('keys', {'type': 'str'})
+        values = spec.get('values', {'type': 'int'})
+        result = {}
+        attempts = 0
+        while len(result) < length and attempts < length + MAX_KEY_ATTEMPTS:
+            attempts += 1
+            key = generate_value(keys, rng)
+            if key not in result:
+                result[key] = generate_value(values, rng)
+        return result
+
+    if kind == 'choice':
+        return rng.choice(spec['options'])
+
+    raise ValueError(f"Unknown generator type: {kind}")
+
+
+def generate_cases(spec):
+    """
+    Generate the setup code for every case in a spec
+
+    The same spec (including its seed) always yields the same cases.
+    Returns list of setup strings like "numbers = [3, -7, 12]"
+    """
+    rng = random.Random(spec.get('seed', DEFAULT_SEED))
+    variables = spec['variables']
+    cases = []
+    for _ in range(spec.get('cases', DEFAULT_CASES)):
+        lines = [f"{name} = {generate_value(variables[name], rng)!r}" for name in variables]
+        cases.append('\n'.join(lines))
+    return cases
@@ -0,0 +1,125 @@
+"""
+Function Harness - Grade problems that ask for a function
+Executes the module once, then calls its entry function with each test input
+"""
+
+import contextlib
+import inspect
+
+from src.core.sandbox import (
+    CappedOutput, ExecutionMonitor, InputFeeder, make_print, make_input, current_context,
+    DEFAULT_MAX_OUTPUT_BYTES, DEFAULT_MAX_OUTPUT_LINES, DEFAULT_MAX_STEPS, STUDENT_FILENAME
+)
+
+
+# Filename of the one-line call stub; not student code, so never monitored
+CALL_FILENAME = '<call>'
+CALL_CODE = compile("__result__ = __entry__(**__kwargs__)", CALL_FILENAME, 'exec')
+
+
+class FunctionHarness:
+    """
+    Calls one function of a module that was executed a single time
+
+    Each call gets its own output capture and step budget. A test input is
+    setup code (e.g. "numbers = [1, 2]"); the names it assigns that the
+    function accepts become keyword arguments. The call's output is what the function prints,
+    followed by its return value on its own line when that is not None.
+    Module globals are shared between calls, as they would be for a
+    student calling the function several times. Builtins, preloaded data
+    and the recursion limit come from the ExecutionContext current when
+    the harness is created.
+    """
+
+    def __init__(self, code, function_name, max_steps=DEFAULT_MAX_STEPS,
+                 max_output_bytes=DEFAULT_MAX_OUTPUT_BYTES, max_output_lines=DEFAULT_MAX_OUTPUT_LINES):
+        self.function_name = function_name
+        self.max_steps = max_steps
+        self.max_output_bytes = max_output_bytes
+        self.max_output_lines = max_output_lines
+        self.module_output = ''
+        self.error = None
+        self.load_coverage = None       # CoverageData of the module body
+
+        self._code_object = None
+        self._context = current_context()
+        self._globals = self._context.new_globals(CappedOutput(max_output_bytes, max_output_lines))
+        self._builtins = self._globals['__builtins__']
+        self._load(code)
+
+    def _load(self, code):
+        """Execute the module body once under the step budget"""
+        sink = self._new_sink()
+        try:
+            self._code_object = compile(code, STUDENT_FILENAME, 'exec')
+            monitor = ExecutionMonitor(self.max_steps, recursion_limit=self._context.recursion_limit, coverage=True)
+            self.load_coverage = monitor.coverage
+            monitor.run(self._code_object, self._globals)
+            sink.check()
+        except Exception as e:
+            self.error = f"Error while loading your code: {e}"
+        self.module_output = sink.getvalue()
+
+    def _new_sink(self, sink=None):
+        """Fresh capture (or the given sink), made the target of the module's print()"""
+        if sink is None:
+            sink = CappedOutput(self.max_output_bytes, self.max_output_lines)
+        self._builtins['print'] = make_print(sink)
+        if self._context.allows_input:
+            self._builtins['input'] = make_input(InputFeeder(''), sink)
+        return sink
+
+    @staticmethod
+    def _select_arguments(function, namespace):
+        """Names from the test input that the function accepts as keywords"""
+        namespace = {k: v for k, v in namespace.items() if k != '__builtins__'}
+        try:
+            parameters = inspect.signature(function).parameters.values()
+        except (TypeError, ValueError):
+            return namespace
+        if any(p.kind == p.VAR_KEYWORD for p in parameters):
+            return namespace
+        accepted = {p.name for p in parameters if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)}
+        return {k: v for k, v in namespace.items() if k in accepted}
+
+    def call(self, setup='', monitor=None, memory=None, sink=None):
+        """
+        Call the entry function with the names setup assigns
+
+        Args:
+            setup: Test input code whose variables become keyword arguments
+            monitor: ExecutionMonitor for the call (default: step budget only)
+            memory: Optional MemoryTracker around the call
+            sink: Output capture to use instead of a fresh CappedOutput
+
+        Returns:
+            Output of the call
+        """
+        if self.error:
+            raise Exception(self.error)
+        function = self._globals.get(self.function_name)
+        if not callable(function):
+            raise Exception(f"Define a function named '{self.function_name}'")
+
+        inputs = {'__builtins__': self._builtins}
+        if setup:
+            exec(compile(setup, '<input>', 'exec'), inputs)
+        arguments = self._select_arguments(function, inputs)
+
+        sink = self._new_sink(sink)
+        namespace = {'__builtins__': self._builtins, '__entry__': function, '__kwargs__': arguments}
+        if monitor is None:
+            monitor = ExecutionMonitor(self.max_steps, memory=memory)
+        if monitor.recursion_limit is None:
+            monitor.recursion_limit = self._context.recursion_limit
+        try:
+            with memory if memory is not None else contextlib.nullcontext():
+                monitor.run(CALL_CODE, namespace, extra_code=(self._code_object,))
+            result = namespace.get('__result__')
+            if result is not None:
+                self._builtins['print'](result)
+        except Exception:
+            sink.check()
+            raise
+        sink.check()
+        return sink.getvalue()
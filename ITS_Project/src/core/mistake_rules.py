@@ -0,0 +1,427 @@
+"""
+Mistake Rules - Single-pass common mistake detection
+Tokenizes student code once and dispatches tokens and logical lines to registered rules
+"""
+
+import io
+import tokenize
+
+
+# Token types that carry no meaning for the rules
+SKIPPED_TOKENS = {
+    tokenize.NL, tokenize.COMMENT, tokenize.NEWLINE,
+    tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER
+}
+
+
+class LogicalLine:
+    """Significant tokens of one logical source line"""
+
+    def __init__(self, tokens, indented):
+        self.tokens = tokens
+        self.indented = indented
+        self.lineno = tokens[0].start[0]
+        self.text = tokens[0].line.strip()
+        self.next = None
+
+    @property
+    def first(self):
+        """String of the first token"""
+        return self.tokens[0].string
+
+    @property
+    def last(self):
+        """String of the last token"""
+        return self.tokens[-1].string
+
+    def has_name(self, name):
+        """Check if a NAME token (not inside a string) appears on the line"""
+        return any(t.type == tokenize.NAME and t.string == name for t in self.tokens)
+
+    def split_for(self):
+        """
+        Split a for statement into target and iterable tokens
+        Returns (target_tokens, iterable_tokens) or None if there is no 'in'
+        """
+        for i, token in enumerate(self.tokens):
+            if token.type == tokenize.NAME and token.string == 'in':
+                iterable = self.tokens[i + 1:]
+                # Drop the block colon and anything after it
+                for j, t in enumerate(iterable):
+                    if t.string == ':':
+                        iterable = iterable[:j]
+                        break
+                return self.tokens[1:i], iterable
+        return None
+
+
+class DetectionContext:
+    """Per-call state shared by rules while scanning one submission"""
+
+    def __init__(self, concept):
+        self.concept = concept
+        self.detected = []
+        self.state = {}
+
+    def report(self, rule, line=None, message=None):
+        """Record a detected mistake"""
+        self.detected.append({
+            'type': rule.mistake_type,
+            'message': message or rule.message,
+            'line': line.text if line else None,
+            'lineno': line.lineno if line else None
+        })
+
+
+class MistakeRule:
+    """
+    Base class for a mistake detection rule
+
+    Rules are stateless so one registry can be shared between threads;
+    anything remembered during a scan goes in ctx.state.
+    """
+
+    mistake_type = None
+    message = ''
+    concepts = None     # Only applies to these concepts (None = always)
+    keywords = ()       # Receives logical lines starting with these tokens
+    tokens = ()         # Receives every token with these strings
+
+    def __init__(self, message=None, name=None):
+        if message:
+            self.message = message
+        self.name = name or self.mistake_type
+
+    def applies_to(self, concept):
+        """Check if this rule is active for the problem concept"""
+        return self.concepts is None or concept in self.concepts
+
+    def check_line(self, line, ctx):
+        """Inspect a logical line whose first token is in keywords"""
+
+    def check_token(self, line, index, ctx):
+        """Inspect line.tokens[index], whose string is in tokens"""
+
+    def finish(self, ctx):
+        """Called once after the whole submission was scanned"""
+
+
+class MissingColonRule(MistakeRule):
+    """for statement without a block colon"""
+
+    mistake_type = 'missing_colon'
+    message = "Missing colon (:) at the end of the for statement. Python requires a colon to start a code block."
+    keywords = ('for',)
+
+    def check_line(self, line, ctx):
+        if line.has_name('in') and not _has_top_level_colon(line.tokens):
+            ctx.report(self, line)
+
+
+class MissingInRule(MistakeRule):
+    """for statement without the 'in' keyword"""
+
+    mistake_type = 'missing_in'
+    message = "Missing 'in' keyword in for loop. Correct syntax: for item in collection:"
+    keywords = ('for',)
+
+    def check_line(self, line, ctx):
+        if not line.has_name('in'):
+            ctx.report(self, line)
+
+
+class UnnecessaryIndexRule(MistakeRule):
+    """Indexing with [i] while iterating directly over values"""
+
+    mistake_type = 'unnecessary_index'
+    message = "Using index syntax when not needed. When iterating directly with 'for item in list', the item variable already contains the value."
+    concepts = {'BasicListIteration', 'StringIteration'}
+    tokens = ('[', 'enumerate')
+
+    def check_token(self, line, index, ctx):
+        state = ctx.state.setdefault(self.name, {'indexed': False, 'enumerate': False})
+        token = line.tokens[index]
+        if token.string == 'enumerate':
+            state['enumerate'] = True
+        elif _matches(line.tokens, index + 1, [(tokenize.NAME, ('i', 'index')), (None, (']',))]):
+            state['indexed'] = True
+
+    def finish(self, ctx):
+        state = ctx.state.get(self.name)
+        if state and state['indexed'] and not state['enumerate']:
+            ctx.report(self)
+
+
+class EnumerateSingleVarRule(MistakeRule):
+    """for x in enumerate(...) without unpacking"""
+
+    mistake_type = 'enumerate_single_var'
+    message = "enumerate() returns (index, value) tuples. You must unpack both: for i, item in enumerate(list)"
+    keywords = ('for',)
+
+    def check_line(self, line, ctx):
+        parts = line.split_for()
+        if parts and _is_single_name(parts[0]) and parts[1] and parts[1][0].string == 'enumerate':
+            ctx.report(self, line)
+
+
+class ItemsSingleVarRule(MistakeRule):
+    """for x in d.items() without unpacking"""
+
+    mistake_type = 'items_single_var'
+    message = "dict.items() returns (key, value) tuples. You must unpack both: for key, value in dict.items()"
+    keywords = ('for',)
+
+    def check_line(self, line, ctx):
+        parts = line.split_for()
+        if parts and _is_single_name(parts[0]):
+            strings = [t.string for t in parts[1]]
+            if strings[-4:] == ['.', 'items', '(', ')'] and len(strings) > 4:
+                ctx.report(self, line)
+
+
+class MissingEnumerateRule(MistakeRule):
+    """for i, x in values without calling enumerate()"""
+
+    mistake_type = 'missing_enumerate'
+    message = "Forgetting to call enumerate() - just writing 'for i, x in list' won't work."
+    concepts = {'EnumerateListIteration'}
+    keywords = ('for',)
+
+    def check_line(self, line, ctx):
+        parts = line.split_for()
+        if parts and ',' in [t.string for t in parts[0]] and _is_single_name(parts[1]):
+            ctx.report(self, line)
+
+
+class WrongMethodRule(MistakeRule):
+    """Using .items() where .keys() or .values() is expected"""
+
+    mistake_type = 'wrong_method'
+    concepts = {'DictKeysIteration', 'DictValuesIteration', 'DisctValueIteration'}
+    tokens = ('items',)
+
+    MESSAGES = {
+        'DictKeysIteration': "Use .keys() to iterate over dictionary keys only, not .items()",
+        'DictValuesIteration': "Use .values() to iterate over dictionary values only, not .items()",
+        # Concept name as spelled in the ontology
+        'DisctValueIteration': "Use .values() to iterate over dictionary values only, not .items()"
+    }
+
+    def check_token(self, line, index, ctx):
+        if index > 0 and line.tokens[index - 1].string == '.' and self.name not in ctx.state:
+            ctx.state[self.name] = True
+            ctx.report(self, message=self.message or self.MESSAGES.get(ctx.concept))
+
+
+class IndentationRule(MistakeRule):
+    """for block whose body is not indented"""
+
+    mistake_type = 'indentation'
+    message = "Loop body must be indented. Python uses indentation to define code blocks (usually 4 spaces)."
+    keywords = ('for',)
+
+    def check_line(self, line, ctx):
+        if line.last == ':' and line.next is not None and not line.next.indented:
+            ctx.report(self, line.next)
+
+
+class TokenSequenceRule(MistakeRule):
+    """
+    Generic rule defined by a token pattern, e.g. "for NAME in enumerate"
+
+    Upper-case items (NAME, NUMBER, STRING, OP) match any token of that
+    type; everything else must match the token string exactly. The first
+    item must be a literal so the rule can be dispatched by token.
+    """
+
+    mistake_type = 'token_sequence'
+
+    def __init__(self, pattern, message=None, name=None, concepts=None):
+        super().__init__(message, name)
+        if name:
+            self.mistake_type = name
+        self.pattern = []
+        for item in pattern.split():
+            if item.isupper() and hasattr(tokenize, item):
+                self.pattern.append((getattr(tokenize, item), None))
+            else:
+                self.pattern.append((None, (item,)))
+        if not self.pattern or self.pattern[0][1] is None:
+            raise ValueError(f"Pattern must start with a literal token: {pattern!r}")
+        self.tokens = self.pattern[0][1]
+        if concepts:
+            self.concepts = set(concepts)
+
+    def check_token(self, line, index, ctx):
+        if _matches(line.tokens, index, self.pattern):
+            ctx.report(self, line)
+
+
+# Rule types that CommonMistake individuals can reference by mistakeType
+RULE_TYPES = {
+    rule.mistake_type: rule
+    for rule in (
+        MissingColonRule, MissingInRule, UnnecessaryIndexRule,
+        EnumerateSingleVarRule, ItemsSingleVarRule, MissingEnumerateRule,
+        WrongMethodRule, IndentationRule
+    )
+}
+
+
+class MistakeRuleRegistry:
+    """Holds rules indexed by the tokens and keywords they react to"""
+
+    def __init__(self, rules=()):
+        self.rules = []
+        self._tables = {}
+        for rule in rules:
+            self.register(rule)
+
+    @classmethod
+    def default(cls):
+        """Registry with every built-in rule"""
+        return cls(rule_class() for rule_class in RULE_TYPES.values())
+
+    @classmethod
+    def from_ontology(cls, mistakes):
+        """
+        Build a registry from CommonMistake dicts (see OntologyManager.get_common_mistakes)
+
+        Mistakes with a known 'type' replace the built-in rule of that type and
+        supply its message; mistakes with a 'pattern' become TokenSequenceRules.
+        Built-in rules not mentioned in the ontology stay active.
+        """
+        rules = {name: rule_class() for name, rule_class in RULE_TYPES.items()}
+        for mistake in mistakes:
+            if mistake.get('pattern'):
+                try:
+                    rules[mistake['name']] = TokenSequenceRule(
+                        mistake['pattern'], mistake.get('message'), mistake['name']
+                    )
+                except ValueError:
+                    continue
+            elif mistake.get('type') in RULE_TYPES:
+                rules[mistake['type']] = RULE_TYPES[mistake['type']](
+                    mistake.get('message'), mistake['name']
+                )
+        return cls(rules.values())
+
+    def register(self, rule):
+        """Add a rule to the registry"""
+        self.rules.append(rule)
+        self._tables = {}
+
+    def _table_for(self, concept):
+        """Dispatch tables for one concept, built once and reused"""
+        table = self._tables.get(concept)
+        if table is None:
+            line_rules, token_rules, finish_rules = {}, {}, []
+            for rule in self.rules:
+                if not rule.applies_to(concept):
+                    continue
+                for keyword in rule.keywords:
+                    line_rules.setdefault(keyword, []).append(rule)
+                for string in rule.tokens:
+                    token_rules.setdefault(string, []).append(rule)
+                if type(rule).finish is not MistakeRule.finish:
+                    finish_rules.append(rule)
+            table = (line_rules, token_rules, finish_rules)
+            self._tables[concept] = table
+        return table
+
+    def detect(self, code, concept=None):
+        """
+        Scan code once and run every applicable rule
+
+        Args:
+            code: Student's code
+            concept: The concept being tested (e.g., 'BasicListIteration')
+
+        Returns:
+            List of detected mistake dicts with: type, message, line, lineno
+        """
+        line_rules, token_rules, finish_rules = self._table_for(concept)
+        ctx = DetectionContext(concept)
+
+        previous = None
+        for line in _logical_lines(code):
+            if previous is not None:
+                previous.next = line
+                self._dispatch(previous, line_rules, token_rules, ctx)
+            previous = line
+        if previous is not None:
+            self._dispatch(previous, line_rules, token_rules, ctx)
+
+        for rule in finish_rules:
+            rule.finish(ctx)
+
+        return ctx.detected
+
+    @staticmethod
+    def _dispatch(line, line_rules, token_rules, ctx):
+        """Hand a completed logical line to interested rules"""
+        for rule in line_rules.get(line.first, ()):
+            rule.check_line(line, ctx)
+        if token_rules:
+            for index, token in enumerate(line.tokens):
+                for rule in token_rules.get(token.string, ()):
+                    rule.check_token(line, index, ctx)
+
+
+def _logical_lines(code):
+    """
+    Yield LogicalLine objects from a single tokenize pass
+    Stops quietly at the first tokenize error so broken code is still scanned
+    """
+    tokens = []
+    indented = False
+    reader = io.StringIO(code).readline
+
+    try:
+        for token in tokenize.generate_tokens(reader):
+            if token.type == tokenize.INDENT:
+                indented = True
+            elif token.type == tokenize.NEWLINE:
+                if tokens:
+                    yield LogicalLine(tokens, indented)
+                tokens = []
+                indented = False
+            elif token.type not in SKIPPED_TOKENS:
+                tokens.append(token)
+    except (tokenize.TokenError, SyntaxError):
+        pass
+
+    if tokens:
+        yield LogicalLine(tokens, indented)
+
+
+def _matches(tokens, start, pattern):
+    """Check if tokens[start:] begins with pattern of (type, strings) items"""
+    if start + len(pattern) > len(tokens):
+        return False
+    for offset, (token_type, strings) in enumerate(pattern):
+        token = tokens[start + offset]
+        if token_type is not None and token.type != token_type:
+            return False
+        if strings is not None and token.string not in strings:
+            return False
+    return True
+
+
+def _is_single_name(tokens):
+    """Check if a token run is exactly one identifier"""
+    return len(tokens) == 1 and tokens[0].type == tokenize.NAME
+
+
+def _has_top_level_colon(tokens):
+    """Check for a ':' outside any brackets (the block colon)"""
+    depth = 0
+    for token in tokens:
+        if token.type == tokenize.OP and token.string in ('(', '[', '{'):
+            depth += 1
+        elif token.type == tokenize.OP and token.string in (')', ']', '}'):
+            depth -= 1
+        elif token.string == ':' and depth == 0:
+            return True
+    return False
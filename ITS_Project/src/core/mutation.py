@@ -0,0 +1,235 @@
+"""
+Mutation Testing - Check that a problem's tests reject wrong loops
+Mutates each reference solution through AST transforms and grades the mutants in a process pool
+"""
+
+import ast
+import copy
+import time
+from multiprocessing import Pool
+
+from src.core import batch_grader
+
+
+# Mutants only need the correctness tests; the smoke stage stops at the first kill
+MUTATION_STAGES = 'parse, smoke!, tests'
+
+_SWAPPED_METHODS = {
+    'keys': ('values', 'items'),
+    'values': ('keys', 'items'),
+    'items': ('keys', 'values')
+}
+
+_SWAPPED_COMPARISONS = {
+    ast.Lt: ast.LtE, ast.LtE: ast.Lt,
+    ast.Gt: ast.GtE, ast.GtE: ast.Gt,
+    ast.Eq: ast.NotEq, ast.NotEq: ast.Eq
+}
+
+_SWAPPED_OPERATORS = {
+    ast.Add: ast.Sub, ast.Sub: ast.Add,
+    ast.Mult: ast.Div, ast.Div: ast.Mult
+}
+
+
+class _Mutator(ast.NodeTransformer):
+    """
+    Applies the target-th of all possible mutations of a tree
+
+    Every place a mutation could be made counts as one site, in a fixed
+    order, so running with target=-1 just counts the sites.
+    """
+
+    def __init__(self, target=-1):
+        self.target = target
+        self.sites = 0
+        self.description = None
+
+    def _hit(self, node, before, after):
+        """Claim the next site; True if it is the one to mutate"""
+        hit = self.sites == self.target
+        self.sites += 1
+        if hit:
+            self.description = f"line {node.lineno}: {before} -> {after}"
+        return hit
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        # Skip the first or last element of the sequence being looped over
+        if not isinstance(node.iter, ast.Call):
+            source = ast.unparse(node.iter)
+            for lower, upper, text in ((1, None, '[1:]'), (None, -1, '[:-1]')):
+                if self._hit(node, source, source + text):
+                    node.iter = ast.Subscript(
+                        value=node.iter,
+                        slice=ast.Slice(
+                            lower=ast.Constant(lower) if lower is not None else None,
+                            upper=ast.Constant(upper) if upper is not None else None
+                        ),
+                        ctx=ast.Load()
+                    )
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        before = ast.unparse(node)
+        function = node.func
+
+        if isinstance(function, ast.Name) and function.id == 'range':
+            # Off-by-one in either bound
+            for index, argument in enumerate(node.args[:2]):
+                for operator in (ast.Add, ast.Sub):
+                    mutant = copy.deepcopy(node)
+                    mutant.args[index] = ast.BinOp(left=argument, op=operator(), right=ast.Constant(1))
+                    if self._hit(node, before, ast.unparse(mutant)):
+                        return mutant
+
+        if isinstance(function, ast.Name) and function.id == 'enumerate':
+            has_start = len(node.args) > 1 or any(k.arg == 'start' for k in node.keywords)
+            mutant = copy.deepcopy(node)
+            if has_start:
+                mutant.args = mutant.args[:1]
+                mutant.keywords = [k for k in mutant.keywords if k.arg != 'start']
+            else:
+                mutant.keywords.append(ast.keyword(arg='start', value=ast.Constant(1)))
+            if self._hit(node, before, ast.unparse(mutant)):
+                return mutant
+
+        if isinstance(function, ast.Name) and function.id in ('reversed', 'sorted') and node.args:
+            if self._hit(node, before, ast.unparse(node.args[0])):
+                return node.args[0]
+
+        if isinstance(function, ast.Attribute) and function.attr in _SWAPPED_METHODS and not node.args:
+            for method in _SWAPPED_METHODS[function.attr]:
+                mutant = copy.deepcopy(node)
+                mutant.func.attr = method
+                if self._hit(node, before, ast.unparse(mutant)):
+                    return mutant
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        for index, operator in enumerate(node.ops):
+            swapped = _SWAPPED_COMPARISONS.get(type(operator))
+            if swapped is None:
+                continue
+            mutant = copy.deepcopy(node)
+            mutant.ops[index] = swapped()
+            if self._hit(node, ast.unparse(node), ast.unparse(mutant)):
+                return mutant
+        return node
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        swapped = _SWAPPED_OPERATORS.get(type(node.op))
+        if swapped is not None:
+            mutant = copy.deepcopy(node)
+            mutant.op = swapped()
+            if self._hit(node, ast.unparse(node), ast.unparse(mutant)):
+                return mutant
+        return node
+
+    def visit_Break(self, node):
+        if self._hit(node, 'break', 'continue'):
+            return ast.Continue()
+        return node
+
+    def visit_Continue(self, node):
+        if self._hit(node, 'continue', 'break'):
+            return ast.Break()
+        return node
+
+
+def generate_mutants(code):
+    """
+    Every single-site mutant of code
+
+    Returns list of dicts with: description, code (duplicates and mutants
+    that unparse to the original are dropped); empty if code does not parse
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    counter = _Mutator()
+    counter.visit(copy.deepcopy(tree))
+
+    original = ast.unparse(tree)
+    seen = {original}
+    mutants = []
+    for target in range(counter.sites):
+        mutator = _Mutator(target)
+        mutant_tree = ast.fix_missing_locations(mutator.visit(copy.deepcopy(tree)))
+        mutant_code = ast.unparse(mutant_tree)
+        if mutator.description is None or mutant_code in seen:
+            continue
+        seen.add(mutant_code)
+        mutants.append({'description': mutator.description, 'code': mutant_code})
+    return mutants
+
+
+def mutation_table(problems):
+    """Copy of a batch_grader problem table that runs only the correctness stages"""
+    table = {}
+    for name, entry in problems.items():
+        details = dict(entry['details'], stages=MUTATION_STAGES)
+        table[name] = {'details': details, 'solution_code': entry['solution_code']}
+    return table
+
+
+def run_mutation_tests(problems, workers=None, chunksize=4, problem_names=None):
+    """
+    Grade every mutant of every reference solution across a process pool
+
+    A mutant is killed when it scores below 100; survivors point at
+    behaviour the tests never check.
+
+    Args:
+        problems: Table from batch_grader.load_problem_table()
+        workers: Number of processes (defaults to CPU count)
+        chunksize: Mutants handed to a worker at a time
+        problem_names: Only these problems (default: all)
+
+    Returns:
+        dict with: problems (name -> {mutants, killed, score, survivors}),
+        count, elapsed
+    """
+    start = time.perf_counter()
+    table = mutation_table(problems)
+    report = {}
+    submissions = []
+    for name, entry in table.items():
+        if problem_names and name not in problem_names:
+            continue
+        if not entry['solution_code']:
+            continue
+        mutants = generate_mutants(entry['solution_code'])
+        report[name] = {'mutants': len(mutants), 'killed': 0, 'score': None, 'survivors': []}
+        for number, mutant in enumerate(mutants):
+            submissions.append({
+                'id': number,
+                'problem': name,
+                'code': mutant['code'],
+                'description': mutant['description']
+            })
+
+    by_key = {(s['problem'], s['id']): s for s in submissions}
+    with Pool(processes=workers, initializer=batch_grader._init_worker, initargs=(table, [])) as pool:
+        for record in pool.imap_unordered(batch_grader._grade_submission, submissions, chunksize):
+            problem_report = report[record['problem']]
+            if record.get('score', 0) < 100:
+                problem_report['killed'] += 1
+            else:
+                mutant = by_key[(record['problem'], record['id'])]
+                problem_report['survivors'].append({'description': mutant['description'], 'code': mutant['code']})
+
+    for problem_report in report.values():
+        problem_report['survivors'].sort(key=lambda s: s['description'])
+        if problem_report['mutants']:
+            problem_report['score'] = int(problem_report['killed'] / problem_report['mutants'] * 100)
+
+    return {
+        'problems': report,
+        'count': len(submissions),
+        'elapsed': time.perf_counter() - start
+    }
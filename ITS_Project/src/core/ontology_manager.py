@@ -4,9 +4,16 @@ Provides clean interface to access concepts, problems, solutions, and test cases
 """
 
 from owlready2 import *
+import json
 import os
 import logging
 
+from src.core.comparators import validate_policy
+from src.core.performance import parse_sizes
+from src.core.generators import parse_generator
+from src.core.pipeline import parse_stages
+from src.core.sandbox import parse_builtins
+
 # Configure logging for debugging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
@@ -124,7 +131,14 @@ class OntologyManager:
     def get_problem_details(self, problem):
         """
         Extract all details for a problem
-        Returns dict with: name, description, hint, difficulty, concept, test_cases, expected_output, starter_code
+        Returns dict with: name, description, hint, difficulty, concept, test_cases,
+        performance_tests, input_generator, expected_output, starter_code, comparison,
+        memory_limit (bytes, or None), entry_function (function to call, or None),
+        input_mode ('code' or 'stdin'), stages (validation stage list, or None for all),
+        allowed_builtins (extra builtin names), preloaded_data (dict of globals every run
+        starts with), recursion_limit (max nested calls, or None)
+        A test case may also have input_file (served to input()) and output_file
+        (expected output) for large data kept next to the ontology.
         """
         try:
             details = {
@@ -134,8 +148,18 @@ class OntologyManager:
                 'difficulty': self._get_int_property(problem, 'difficultyLevel') or 1,
                 'concept': None,
                 'test_cases': [],
+                'performance_tests': [],
+                'input_generator': None,
                 'expected_output': '',
-                'starter_code': '# Write your code here\n'
+                'starter_code': '# Write your code here\n',
+                'comparison': 'exact',
+                'memory_limit': self._get_int_property(problem, 'memoryLimit'),
+                'entry_function': self._get_property(problem, 'entryFunction'),
+                'input_mode': self._get_property(problem, 'inputMode') or 'code',
+                'stages': None,
+                'allowed_builtins': [],
+                'preloaded_data': {},
+                'recursion_limit': self._get_int_property(problem, 'recursionLimit')
             }
             
             # Get required concept name
@@ -151,12 +175,61 @@ class OntologyManager:
                         'input': self._get_property(tc, 'testInput') or '',
                         'output': self._get_property(tc, 'testOutput') or ''
                     }
+                    self._add_data_files(tc, test_case)
                     details['test_cases'].append(test_case)
                     
                     # Set expected output from first test case
                     if not details['expected_output'] and test_case['output']:
                         details['expected_output'] = test_case['output']
             
+            # Get performance tests (generated inputs at growing sizes)
+            if hasattr(problem, 'hasPerformanceTest') and problem.hasPerformanceTest:
+                for pt in problem.hasPerformanceTest:
+                    details['performance_tests'].append({
+                        'description': self._get_property(pt, 'perfDescription') or f"Performance test {len(details['performance_tests']) + 1}",
+                        'generator': self._get_property(pt, 'perfGenerator') or '',
+                        'sizes': parse_sizes(self._get_property(pt, 'perfSizes'))
+                    })
+            
+            # Get the output comparison policy, if the problem chooses one
+            comparison = self._get_property(problem, 'comparisonPolicy')
+            if comparison:
+                try:
+                    validate_policy(comparison)
+                    details['comparison'] = comparison
+                except ValueError as e:
+                    logger.warning(f"Ignoring comparisonPolicy of {problem.name}: {e}")
+            
+            # Get the validation stages, if the problem chooses them
+            stages = self._get_property(problem, 'validationStages')
+            if stages:
+                try:
+                    parse_stages(stages)
+                    details['stages'] = stages
+                except ValueError as e:
+                    logger.warning(f"Ignoring validationStages of {problem.name}: {e}")
+            
+            # Get the execution context: extra builtins and preloaded globals
+            try:
+                details['allowed_builtins'] = parse_builtins(self._get_property(problem, 'allowedBuiltins'))
+            except ValueError as e:
+                logger.warning(f"Ignoring allowedBuiltins of {problem.name}: {e}")
+            preloaded = self._get_property(problem, 'preloadedData')
+            if preloaded:
+                try:
+                    details['preloaded_data'] = json.loads(preloaded)
+                    if not isinstance(details['preloaded_data'], dict):
+                        raise ValueError("expected a JSON object of variable names")
+                except ValueError as e:
+                    details['preloaded_data'] = {}
+                    logger.warning(f"Ignoring preloadedData of {problem.name}: {e}")
+            
+            # Get the random input spec, if any
+            try:
+                details['input_generator'] = parse_generator(self._get_property(problem, 'inputGenerator'))
+            except ValueError as e:
+                logger.warning(f"Ignoring inputGenerator of {problem.name}: {e}")
+            
             return details
             
         except Exception as e:
@@ -166,31 +239,34 @@ class OntologyManager:
     def get_common_mistakes(self, problem=None):
         """
         Get common mistakes, optionally filtered by problem
-        Returns list of mistake dicts with: name, message
+        Returns list of mistake dicts with: name, message, type, pattern
         """
         try:
             if problem and hasattr(problem, 'hasMistake') and problem.hasMistake:
                 # Get mistakes linked to this problem
                 mistakes = []
                 for mistake in problem.hasMistake:
-                    mistakes.append({
-                        'name': mistake.name,
-                        'message': self._get_property(mistake, 'errorMessage')
-                    })
+                    mistakes.append(self._mistake_details(mistake))
                 return mistakes
             else:
                 # Get all mistakes if no problem specified
                 all_mistakes = list(self.onto.CommonMistake.instances())
-                return [
-                    {
-                        'name': m.name,
-                        'message': self._get_property(m, 'errorMessage')
-                    }
-                    for m in all_mistakes
-                ]
+                return [self._mistake_details(m) for m in all_mistakes]
         except Exception as e:
             logger.error(f"Error getting common mistakes: {e}")
             return []
+    
+    def _mistake_details(self, mistake):
+        """
+        Extract details for a CommonMistake
+        Returns dict with: name, message, type (detection rule), pattern (token pattern)
+        """
+        return {
+            'name': mistake.name,
+            'message': self._get_property(mistake, 'errorMessage'),
+            'type': self._get_property(mistake, 'mistakeType'),
+            'pattern': self._get_property(mistake, 'detectionPattern')
+        }
 
     def get_all_test_cases(self, problem):
         """
@@ -201,12 +277,14 @@ class OntologyManager:
             test_cases = []
             if hasattr(problem, 'hasTestCase') and problem.hasTestCase:
                 for tc in problem.hasTestCase:
-                    test_cases.append({
+                    test_case = {
                         'name': tc.name,
                         'description': self._get_property(tc, 'testDescription') or f"Test {len(test_cases) + 1}",
                         'input': self._get_property(tc, 'testInput') or '',
                         'output': self._get_property(tc, 'testOutput') or ''
-                    })
+                    }
+                    self._add_data_files(tc, test_case)
+                    test_cases.append(test_case)
             return test_cases
         except Exception as e:
             logger.error(f"Error getting test cases: {e}")
@@ -233,6 +311,18 @@ class OntologyManager:
             logger.error(f"Error getting solution: {e}")
             return None
     
+    def _add_data_files(self, test_case_instance, test_case):
+        """
+        Add input_file / output_file for test data kept outside the ontology
+        Paths are resolved against the ontology file's directory; the files
+        are only opened (memory-mapped) when the test runs
+        """
+        base_dir = os.path.dirname(os.path.abspath(self.ontology_path))
+        for property_name, key in (('testInputFile', 'input_file'), ('testOutputFile', 'output_file')):
+            path = self._get_property(test_case_instance, property_name)
+            if path:
+                test_case[key] = os.path.normpath(os.path.join(base_dir, path))
+    
     def _get_int_property(self, instance, property_name):
         """
         Safely extract integer property value
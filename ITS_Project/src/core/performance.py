@@ -0,0 +1,134 @@
+"""
+Performance Tests - Empirical complexity of student code
+Counts executed steps on generated inputs of growing size and fits a power law
+"""
+
+import ast
+import math
+
+
+# A student exponent this far above the reference's is "asymptotically worse"
+EXPONENT_TOLERANCE = 0.5
+
+# Budget per run as a multiple of the reference's steps at the same size
+STEP_RATIO = 50
+MIN_STEP_BUDGET = 10_000
+
+
+def parse_sizes(text):
+    """Parse input sizes like '1000, 10000, 100000' into sorted ints"""
+    sizes = []
+    for part in (text or '').replace(';', ',').split(','):
+        part = part.strip().replace('_', '')
+        if part:
+            sizes.append(int(float(part)))
+    return sorted(set(sizes))
+
+
+def fit_exponent(sizes, costs):
+    """
+    Least-squares slope of log(cost) against log(size)
+    cost ~ size**k gives k; returns None with fewer than two usable points
+    """
+    points = [(math.log(n), math.log(c)) for n, c in zip(sizes, costs) if n > 0 and c > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def describe_exponent(exponent):
+    """Readable growth rate, e.g. 'O(n)' or 'O(n^2.0)'"""
+    if exponent is None:
+        return "unknown"
+    if exponent < 0.25:
+        return "O(1)"
+    if abs(exponent - 1) < 0.25:
+        return "O(n)"
+    return f"O(n^{exponent:.1f})"
+
+
+def assigned_names(code):
+    """Names assigned at the top level of code (e.g. a generator's input variables)"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set()
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    names.add(target.id)
+        elif isinstance(node, (ast.AnnAssign, ast.AugAssign)) and isinstance(node.target, ast.Name):
+            names.add(node.target.id)
+    return names
+
+
+def reads_inputs(code, names):
+    """
+    Whether code takes its data from the input variables in names
+
+    True when it reads one of them and assigns none at the top level, so an
+    injected input reaches it. Run on code after strip_input_assignments;
+    a submission that still builds its own data (numbers = list(range(5)))
+    or inlines it (for n in [1, 2]) ignores generated inputs.
+    """
+    if not names or assigned_names(code) & names:
+        return False
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return False
+    return any(
+        isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id in names
+        for node in ast.walk(tree)
+    )
+
+
+def strip_input_assignments(code, names):
+    """
+    Remove top-level assignments of literals to input variables
+
+    Solutions and many submissions hard-code the example data
+    (numbers = [1, 2, 3]); without this they would ignore the generated input.
+    Returns code unchanged if it does not parse or nothing matches.
+    """
+    if not names:
+        return code
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code
+
+    lines = code.splitlines(keepends=True)
+    line_owners = {}
+    for node in tree.body:
+        for lineno in range(node.lineno, node.end_lineno + 1):
+            line_owners[lineno] = line_owners.get(lineno, 0) + 1
+
+    removed = []
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if not isinstance(target, ast.Name) or target.id not in names:
+            continue
+        try:
+            ast.literal_eval(node.value)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            continue
+        if any(line_owners[lineno] > 1 for lineno in range(node.lineno, node.end_lineno + 1)):
+            continue    # shares a line with another statement (a = [1]; print(a))
+        removed.append((node.lineno, node.end_lineno))
+
+    if not removed:
+        return code
+    for start, end in reversed(removed):
+        # Keep line numbers stable for error messages and profiles
+        lines[start - 1:end] = ['\n'] * (end - start + 1)
+    return ''.join(lines)
@@ -0,0 +1,383 @@
+"""
+Validation Pipeline - Staged grading of one submission
+parse, rules, smoke, tests, perf, profile and coverage stages, each timed, cacheable and able to stop the run
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from src.core.comparators import DEFAULT_POLICY
+from src.core.coverage_map import coverage_report
+from src.core.performance import reads_inputs, strip_input_assignments
+from src.core.result_cache import problem_fingerprint, code_fingerprint
+from src.core.results import SubmissionResult
+from src.core.sandbox import format_bytes, execution_context
+
+
+# perf is opt-in: a problem lists it in its stages when its performance tests should gate grading
+DEFAULT_STAGES = 'parse, rules, smoke, tests, profile, coverage'
+
+# Stages that always stop the pipeline when they fail; others block when listed with '!' (e.g. 'smoke!')
+BLOCKING_STAGES = {'parse'}
+
+
+def parse_stages(text):
+    """
+    Parse a stage list like 'parse, rules!, tests'
+
+    A trailing '!' makes a stage blocking (a failure stops the pipeline).
+    Unknown names raise ValueError.
+
+    Returns list of (name, blocking) tuples in the given order
+    """
+    stages = []
+    for part in (text or DEFAULT_STAGES).split(','):
+        name = part.strip().lower()
+        if not name:
+            continue
+        blocking = name.endswith('!')
+        name = name.rstrip('!').strip()
+        if name not in STAGES:
+            raise ValueError(f"Unknown validation stage: {name}")
+        stages.append((name, blocking or name in BLOCKING_STAGES))
+    return stages
+
+
+class StageCache:
+    """Bounded LRU of stage outcomes keyed by stage, problem hash, code hash and validator settings"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of (passed, updates) for key, or None"""
+        with self._lock:
+            outcome = self._entries.get(key)
+            if outcome is None:
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(outcome)
+
+    def put(self, key, outcome):
+        """Store (passed, updates), evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = copy.deepcopy(outcome)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class PipelineContext:
+    """Everything the stages of one run share"""
+
+    def __init__(self, validator, student_code, problem_details, solution_code, profile, coverage=False):
+        self.validator = validator
+        self.student_code = student_code
+        self.details = problem_details
+        self.solution_code = solution_code
+        self.profile = profile
+        self.coverage = coverage
+        self.input_mode = problem_details.get('input_mode', 'code')
+        self.entry_function = problem_details.get('entry_function')
+        self.result = SubmissionResult(
+            valid=False,
+            score=0,
+            tests_passed=0,
+            tests_total=0,
+            errors=[],
+            feedback=[],
+            results=[],
+            peak_memory=None,
+            detected_mistakes=[],
+            stages=[]
+        )
+        self._test_cases = None
+        self._harnesses = None
+
+    @property
+    def test_cases(self):
+        """
+        Handwritten test cases, then those generated from the problem's input spec
+        Generated cases only apply to code that reads the injected inputs: a
+        program with its own data is graded on the handwritten cases alone.
+        """
+        if self._test_cases is None:
+            generated = []
+            if self.entry_function or self._reads_generated_inputs():
+                generated = self.validator._generated_test_cases(
+                    self.generator_spec, self.solution_code, self.entry_function
+                )
+            self._test_cases = self.details.get('test_cases', []) + generated
+        return self._test_cases
+
+    def _reads_generated_inputs(self):
+        """Whether the student's program uses the generated input variables"""
+        if not self.generator_spec:
+            return False
+        names = set(self.generator_spec['variables'])
+        return reads_inputs(strip_input_assignments(self.student_code, names), names)
+
+    @property
+    def generator_spec(self):
+        """Input spec used for generated cases ('code' input mode only)"""
+        if self.input_mode != 'code':
+            return None
+        return self.details.get('input_generator')
+
+    @property
+    def performance_tests(self):
+        """Performance tests ('code' input mode only)"""
+        if self.input_mode != 'code':
+            return []
+        return self.details.get('performance_tests', [])
+
+    def harnesses(self):
+        """(student, solution) FunctionHarness pair for function problems, else (None, None)"""
+        if self._harnesses is None:
+            if self.entry_function:
+                # Profiled and covered calls are traced, so the student's harness stays in-process
+                self._harnesses = (
+                    self.validator._harness(
+                        self.student_code, self.entry_function, in_process=self.profile or self.coverage
+                    ),
+                    self.validator._harness(self.solution_code, self.entry_function)
+                )
+            else:
+                self._harnesses = (None, None)
+        return self._harnesses
+
+    def run_test(self, index):
+        """Run test case number index (0-based)"""
+        test_case = self.test_cases[index]
+        code = self.student_code
+        if test_case.get('generated'):
+            # Generated inputs replace any example data the student hard-coded
+            code = strip_input_assignments(code, set(self.generator_spec['variables']))
+        student_harness, solution_harness = self.harnesses()
+        return self.validator._run_hybrid_test(
+            code,
+            self.solution_code,
+            test_case,
+            index + 1,
+            self.details.get('comparison', DEFAULT_POLICY),
+            self.profile,
+            self.details.get('memory_limit'),
+            student_harness,
+            solution_harness,
+            self.input_mode,
+            self.coverage
+        )
+
+
+def _stage_parse(context):
+    """Reject code that does not parse"""
+    syntax_check = context.validator._check_syntax(context.student_code)
+    if syntax_check['valid']:
+        return True, {}
+    return False, {
+        'errors': syntax_check['errors'],
+        'feedback': context.result['feedback'] + ["Fix syntax errors before testing."],
+        'detected_mistakes': context.validator.detect_common_mistakes(
+            context.student_code, context.details.get('concept')
+        )
+    }
+
+
+def _stage_rules(context):
+    """Static mistake rules; fails when any rule fires"""
+    mistakes = context.validator.detect_common_mistakes(
+        context.student_code, context.details.get('concept')
+    )
+    return not mistakes, {'detected_mistakes': mistakes}
+
+
+def _stage_smoke(context):
+    """Run only the first test case"""
+    if not context.test_cases:
+        return False, {'errors': context.result['errors'] + ["No test cases available."]}
+    test_result = context.run_test(0)
+    return test_result['passed'], {
+        'results': [test_result],
+        'tests_passed': int(test_result['passed'])
+    }
+
+
+def _stage_tests(context):
+    """Run every test case the smoke stage did not"""
+    if not context.test_cases:
+        return False, {'errors': context.result['errors'] + ["No test cases available."]}
+    results = list(context.result['results'])
+    for index in range(len(results), len(context.test_cases)):
+        results.append(context.run_test(index))
+    passed = sum(1 for r in results if r['passed'])
+    return passed == len(results), {'results': results, 'tests_passed': passed}
+
+
+def _stage_perf(context):
+    """Performance tests; only meaningful once every output is right"""
+    validator = context.validator
+    results = list(context.result['results'])
+    offset = len(context.test_cases)
+    correct = len(results) == offset and all(r['passed'] for r in results)
+    all_passed = True
+    for idx, perf_test in enumerate(context.performance_tests):
+        test_number = offset + idx + 1
+        if correct:
+            test_result = validator._run_performance_test(
+                context.student_code, context.solution_code, perf_test, test_number,
+                context.entry_function
+            )
+        else:
+            test_result = validator._performance_result(perf_test, test_number)
+            test_result['error'] = "Skipped: pass the other tests first"
+        results.append(test_result)
+        all_passed = all_passed and test_result['passed']
+    passed = sum(1 for r in results if r['passed'])
+    return all_passed, {'results': results, 'tests_passed': passed}
+
+
+def _stage_profile(context):
+    """Sum per-line profiles of the test runs (profiled runs only)"""
+    return True, {'profile': context.validator._merge_profiles(context.result['results'])}
+
+
+def _stage_coverage(context):
+    """Merge per-test line and branch coverage (coverage runs only)"""
+    runs = [r.get('coverage') for r in context.result['results']]
+    return True, {'coverage': coverage_report(context.student_code, runs)}
+
+
+# name -> (function, cacheable)
+STAGES = {
+    'parse': (_stage_parse, True),
+    'rules': (_stage_rules, True),
+    'smoke': (_stage_smoke, True),
+    'tests': (_stage_tests, True),
+    'perf': (_stage_perf, True),
+    'profile': (_stage_profile, False),
+    'coverage': (_stage_coverage, False)
+}
+
+
+class ValidationPipeline:
+    """Runs a problem's stages in order for one submission"""
+
+    def __init__(self, validator, cache=None):
+        """
+        Args:
+            validator: CodeValidator providing the checks and runners
+            cache: StageCache for stage outcomes (None disables stage caching)
+        """
+        self.validator = validator
+        self.cache = cache
+
+    def run(self, student_code, problem_details, solution_code, profile=False, coverage=False):
+        """
+        Grade one submission
+
+        Stages come from problem_details['stages'] (default: DEFAULT_STAGES). Each
+        entry of result['stages'] has name, status ('passed', 'failed' or
+        'skipped'), elapsed_ms and cached. A failing blocking stage stops
+        the run; the score still counts every test. Every execution uses the
+        problem's ExecutionContext template.
+        """
+        token = execution_context.set(self.validator.execution_context(problem_details))
+        try:
+            return self._run(student_code, problem_details, solution_code, profile, coverage)
+        finally:
+            execution_context.reset(token)
+
+    def _run(self, student_code, problem_details, solution_code, profile, coverage):
+        """Run the stages in order (see run)"""
+        context = PipelineContext(
+            self.validator, student_code, problem_details, solution_code, profile, coverage
+        )
+        result = context.result
+        stages = parse_stages(problem_details.get('stages'))
+        stage_names = {name for name, _ in stages}
+
+        cache_prefix = None
+        code_hash = code_fingerprint(student_code)
+        if self.cache is not None and code_hash is not None and not profile:
+            cache_prefix = (
+                problem_fingerprint(problem_details, solution_code), code_hash, coverage,
+                self.validator.settings_hash
+            )
+
+        stopped = None
+        for name, blocking in stages:
+            function, cacheable = STAGES[name]
+            if (name == 'profile' and not profile) or (name == 'coverage' and not coverage):
+                result['stages'].append({'name': name, 'status': 'skipped', 'elapsed_ms': 0.0, 'cached': False})
+                continue
+
+            start = time.perf_counter()
+            key = cache_prefix + (name,) if cacheable and cache_prefix is not None else None
+            outcome = self.cache.get(key) if key is not None else None
+            cached = outcome is not None
+            if outcome is None:
+                outcome = function(context)
+                if key is not None:
+                    self.cache.put(key, outcome)
+            passed, updates = outcome
+            result.update(updates)
+            result['stages'].append({
+                'name': name,
+                'status': 'passed' if passed else 'failed',
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+                'cached': cached
+            })
+            if not passed and blocking:
+                stopped = name
+                break
+
+        self._finish(context, stage_names, stopped)
+        return result
+
+    def _finish(self, context, stage_names, stopped):
+        """Score, feedback and mistakes from whatever stages ran"""
+        result = context.result
+        if stopped == 'parse' or not context.test_cases:
+            return
+
+        # The score always counts every test, run or not
+        result['tests_total'] = len(context.test_cases)
+        if 'perf' in stage_names:
+            result['tests_total'] += len(context.performance_tests)
+
+        peaks = [r['peak_memory'] for r in result['results'] if r.get('peak_memory') is not None]
+        result['peak_memory'] = max(peaks) if peaks else None
+        memory_limit = context.details.get('memory_limit')
+        if memory_limit is not None and any(
+            (r.get('error') or '').startswith("Memory Limit Exceeded") for r in result['results']
+        ):
+            result['feedback'].append(
+                f"Your code used more than {format_bytes(memory_limit)}. "
+                "Try a generator or loop instead of building a full list."
+            )
+        if stopped == 'smoke':
+            result['feedback'].append("Stopped after the first test failed. Fix it to run the rest.")
+        elif stopped == 'rules':
+            result['feedback'].append("Fix the issues below before your code is run.")
+
+        if result['tests_total'] > 0:
+            result['score'] = int((result['tests_passed'] / result['tests_total']) * 100)
+            result['valid'] = result['score'] >= 70
+
+        if result['valid']:
+            if result['score'] == 100:
+                result['feedback'].insert(0, "Perfect! All tests passed!")
+            else:
+                result['feedback'].insert(0, f"Good job! Passed {result['tests_passed']}/{result['tests_total']} tests.")
+            # Mistakes are only reported for failed submissions
+            result['detected_mistakes'] = []
+        else:
+            result['feedback'].insert(0, f"Keep trying! Only {result['tests_passed']}/{result['tests_total']} tests passed.")
+            if 'rules' not in stage_names:
+                result['detected_mistakes'] = context.validator.detect_common_mistakes(
+                    context.student_code, context.details.get('concept')
+                )
@@ -0,0 +1,175 @@
+"""
+Result Cache - Reuse grading results for resubmitted code
+Keyed by problem content hash and source hash; bounded LRU persisted as JSON
+"""
+
+import ast
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from src.core.results import SubmissionResult
+
+
+def _data_file_stamps(test_cases):
+    """(size, mtime) of every external test data file, so edited files change the hash"""
+    stamps = {}
+    for test_case in test_cases:
+        for key in ('input_file', 'output_file'):
+            path = test_case.get(key)
+            if path and path not in stamps:
+                try:
+                    stat = os.stat(path)
+                    stamps[path] = [stat.st_size, stat.st_mtime_ns]
+                except OSError:
+                    stamps[path] = None
+    return stamps
+
+
+def problem_fingerprint(problem_details, solution_code):
+    """Hash of everything that decides a problem's grading (tests, solution, concept, comparison)"""
+    payload = json.dumps({
+        'concept': problem_details.get('concept'),
+        'comparison': problem_details.get('comparison'),
+        'test_cases': problem_details.get('test_cases', []),
+        'performance_tests': problem_details.get('performance_tests', []),
+        'input_generator': problem_details.get('input_generator'),
+        'memory_limit': problem_details.get('memory_limit'),
+        'entry_function': problem_details.get('entry_function'),
+        'input_mode': problem_details.get('input_mode'),
+        'stages': problem_details.get('stages'),
+        'allowed_builtins': problem_details.get('allowed_builtins'),
+        'preloaded_data': problem_details.get('preloaded_data'),
+        'recursion_limit': problem_details.get('recursion_limit'),
+        'data_files': _data_file_stamps(problem_details.get('test_cases', [])),
+        'solution': solution_code
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def settings_fingerprint(settings):
+    """Hash of validator settings that change verdicts (step budget, output caps, isolation)"""
+    payload = json.dumps(settings, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def code_fingerprint(code):
+    """
+    Hash of the exact source text, or None if code does not parse
+    Results carry line numbers (mistakes, coverage), so code that only
+    gained a comment or blank line is graded again rather than reusing them.
+    """
+    try:
+        ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    return hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class ResultCache:
+    """Bounded, persistent cache of validate_with_test_cases results"""
+
+    def __init__(self, cache_file='grading_cache.json', max_entries=500):
+        """
+        Args:
+            cache_file: JSON file to persist to (None keeps the cache in memory only)
+            max_entries: Least recently used entries beyond this are evicted
+        """
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # "problem:problem_hash:code_hash" -> result JSON
+        self._problems = {}             # problem name -> current problem hash
+        self._lock = threading.Lock()
+        self._load()
+
+    def make_key(self, problem_details, solution_code, student_code, variant=None, settings=None):
+        """
+        Cache key for a submission, or None if the code cannot be normalized
+        variant separates results graded with extra options (e.g. 'coverage');
+        settings is the grading validator's settings_fingerprint, so verdicts
+        reached under other limits are never replayed
+        """
+        code_hash = code_fingerprint(student_code)
+        if code_hash is None:
+            return None
+        if variant:
+            code_hash += '+' + variant
+        if settings:
+            code_hash += '@' + settings
+        problem_hash = problem_fingerprint(problem_details, solution_code)
+        return (problem_details.get('name', ''), problem_hash, code_hash)
+
+    def get(self, key):
+        """Return a fresh SubmissionResult for key, or None"""
+        with self._lock:
+            self._check_problem(key)
+            entry_key = ':'.join(key)
+            payload = self._entries.get(entry_key)
+            if payload is None:
+                return None
+            self._entries.move_to_end(entry_key)
+        # Entries are stored encoded, so decoding doubles as the defensive copy
+        return SubmissionResult.from_json(payload)
+
+    def put(self, key, result):
+        """Store a result (a SubmissionResult or plain dict) and persist the cache"""
+        if not isinstance(result, SubmissionResult):
+            result = SubmissionResult.from_dict(result)
+        payload = result.to_json()
+        with self._lock:
+            self._check_problem(key)
+            entry_key = ':'.join(key)
+            self._entries[entry_key] = payload
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, problem_name):
+        """Drop every entry for a problem"""
+        with self._lock:
+            self._drop_problem(problem_name)
+            self._problems.pop(problem_name, None)
+            self._save()
+
+    def _check_problem(self, key):
+        """Drop stale entries when a problem's tests or solution changed"""
+        problem_name, problem_hash, _ = key
+        known = self._problems.get(problem_name)
+        if known != problem_hash:
+            if known is not None:
+                self._drop_problem(problem_name)
+            self._problems[problem_name] = problem_hash
+
+    def _drop_problem(self, problem_name):
+        """Remove entries belonging to problem_name"""
+        prefix = problem_name + ':'
+        for entry_key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[entry_key]
+
+    def _load(self):
+        """Load cache from file"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            self._problems = data.get('problems', {})
+            self._entries = OrderedDict(data.get('entries', []))
+        except Exception as e:
+            print(f"Error loading grading cache: {e}")
+
+    def _save(self):
+        """Save cache to file (caller holds the lock)"""
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, 'w') as f:
+                json.dump({
+                    'problems': self._problems,
+                    'entries': list(self._entries.items())
+                }, f)
+        except Exception as e:
+            print(f"Error saving grading cache: {e}")
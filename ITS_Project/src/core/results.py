@@ -0,0 +1,304 @@
+"""
+Grading Results - Slotted result records for tests and submissions
+Dict-style access for existing callers, plus fast JSON and compact marshal encodings for storage
+"""
+
+import json
+import marshal
+import operator
+import struct
+
+
+# Bumped whenever FIELDS change order; from_bytes rejects other versions
+BINARY_VERSION = 1
+
+_LENGTH = struct.Struct('>I')
+
+
+# Value of an unset field: the key is missing, as in a dict
+_MISSING = object()
+
+
+def _restore(cls, packed):
+    """Unpickle helper (see _SlottedResult.__reduce__)"""
+    return cls._unpack(packed)
+
+
+class _SlottedResult:
+    """
+    A result record that reads and writes like a dict
+
+    Known keys live in __slots__ (FIELDS); an unset field is a missing key.
+    Any other key goes to a small extras dict, so callers can still attach
+    their own data (e.g. a batch record's id).
+    """
+
+    FIELDS = ()
+    NESTED = {}         # field -> _SlottedResult subclass of its list items
+    _FIELD_SET = frozenset()
+    __slots__ = ('_extra',)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+        # Reads every field in one C call; unset fields come back as _MISSING
+        cls._read_all = staticmethod(operator.attrgetter(*cls.FIELDS))
+        cls._setters = tuple(getattr(cls, name).__set__ for name in cls.FIELDS)
+        cls._layouts = {}   # presence bitmask -> (setters of set fields, setters of unset fields)
+
+    @classmethod
+    def _blank(cls):
+        result = cls.__new__(cls)
+        result._extra = None
+        for setter in cls._setters:
+            setter(result, _MISSING)
+        return result
+
+    def __init__(self, **values):
+        self._extra = None
+        for setter in self._setters:
+            setter(self, _MISSING)
+        for key, value in values.items():
+            self[key] = value
+
+    # Dict-style access
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        elif self._extra is None:
+            self._extra = {key: value}
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET and getattr(self, key) is not _MISSING:
+            setattr(self, key, _MISSING)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key) is not _MISSING
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, key, default=None):
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def keys(self):
+        keys = [name for name, value in zip(self.FIELDS, self._read_all(self)) if value is not _MISSING]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, other=(), **values):
+        items = other.items() if hasattr(other, 'items') else other
+        for key, value in items:
+            self[key] = value
+        for key, value in values.items():
+            self[key] = value
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def setdefault(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+    def copy(self):
+        """Shallow copy, like dict.copy()"""
+        duplicate = type(self).__new__(type(self))
+        duplicate._extra = dict(self._extra) if self._extra else None
+        for setter, value in zip(self._setters, self._read_all(self)):
+            setter(duplicate, value)
+        return duplicate
+
+    def __eq__(self, other):
+        if isinstance(other, _SlottedResult):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    # Encodings
+
+    def to_dict(self):
+        """Plain dict (nested results converted too)"""
+        data = {
+            name: value for name, value in zip(self.FIELDS, self._read_all(self))
+            if value is not _MISSING
+        }
+        for name in self.NESTED:
+            if data.get(name):
+                data[name] = [v.to_dict() if isinstance(v, _SlottedResult) else v for v in data[name]]
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from a dict such as to_dict() returns (the dict's values are shared, not copied)"""
+        result = cls._blank()
+        for key, value in data.items():
+            nested = cls.NESTED.get(key)
+            if nested is not None and value:
+                value = [nested.from_dict(v) if isinstance(v, dict) else v for v in value]
+            result[key] = value
+        return result
+
+    def to_json(self):
+        """JSON object text"""
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def _pack(self):
+        """(presence bitmask, values of set fields in FIELDS order, extras)"""
+        mask = 0
+        values = []
+        bit = 1
+        for value in self._read_all(self):
+            if value is not _MISSING:
+                mask |= bit
+                values.append(value)
+            bit <<= 1
+        if self.NESTED:
+            # Nested results are packed in place of their objects
+            position = 0
+            for index, name in enumerate(self.FIELDS):
+                if mask >> index & 1:
+                    if name in self.NESTED and values[position]:
+                        values[position] = [
+                            v._pack() if isinstance(v, _SlottedResult) else v for v in values[position]
+                        ]
+                    position += 1
+        return mask, values, self._extra
+
+    @classmethod
+    def _layout(cls, mask):
+        layout = cls._layouts.get(mask)
+        if layout is None:
+            present = tuple(s for index, s in enumerate(cls._setters) if mask >> index & 1)
+            missing = tuple(s for index, s in enumerate(cls._setters) if not mask >> index & 1)
+            layout = cls._layouts[mask] = (present, missing)
+        return layout
+
+    @classmethod
+    def _unpack(cls, packed):
+        mask, values, extra = packed
+        result = cls.__new__(cls)
+        result._extra = dict(extra) if extra else None
+        present, missing = cls._layout(mask)
+        for setter, value in zip(present, values):
+            setter(result, value)
+        for setter in missing:
+            setter(result, _MISSING)
+        for name, nested in cls.NESTED.items():
+            value = getattr(result, name)
+            if value is not _MISSING and value:
+                setattr(result, name, [nested._unpack(v) if isinstance(v, tuple) else v for v in value])
+        return result
+
+    def to_bytes(self):
+        """
+        Compact binary encoding (marshal; field names are not stored)
+        Only for data this program wrote: marshal is not safe on untrusted input.
+        """
+        return marshal.dumps((BINARY_VERSION, self._pack()))
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, packed = marshal.loads(data)
+        if version != BINARY_VERSION:
+            raise ValueError(f"Unsupported result encoding version: {version}")
+        return cls._unpack(packed)
+
+    def __reduce__(self):
+        # Pickle (worker pools, deepcopy) through the packed form instead of per-slot state
+        return _restore, (type(self), self._pack())
+
+
+class TestResult(_SlottedResult):
+    """Outcome of one test case (correctness or performance)"""
+
+    FIELDS = (
+        'test_number', 'kind', 'description', 'passed', 'expected', 'actual',
+        'solution_output', 'error', 'first_diff_line', 'diff', 'peak_memory', 'input_used',
+        'profile', 'coverage',
+        # performance tests only
+        'sizes', 'reference_steps', 'student_steps', 'reference_exponent', 'student_exponent'
+    )
+    __slots__ = FIELDS
+
+
+class SubmissionResult(_SlottedResult):
+    """Outcome of grading one submission; 'results' holds its TestResults"""
+
+    FIELDS = (
+        'valid', 'score', 'tests_passed', 'tests_total', 'errors', 'feedback', 'results',
+        'peak_memory', 'detected_mistakes', 'stages', 'profile', 'coverage', 'cached'
+    )
+    NESTED = {'results': TestResult}
+    __slots__ = FIELDS
+
+
+def write_binary(stream, result):
+    """Append one length-prefixed to_bytes() record to a binary stream"""
+    data = result.to_bytes()
+    stream.write(_LENGTH.pack(len(data)))
+    stream.write(data)
+
+
+def read_binary(stream, cls=SubmissionResult):
+    """Yield the records write_binary() wrote to a binary stream"""
+    while True:
+        header = stream.read(_LENGTH.size)
+        if len(header) < _LENGTH.size:
+            return
+        (length,) = _LENGTH.unpack(header)
+        yield cls.from_bytes(stream.read(length))
@@ -0,0 +1,679 @@
+"""
+Sandbox - Building blocks for running student code
+Bounded output capture, per-execution print() and input(), a deterministic
+step budget, cooperative cancellation, memory measurement, an optional
+per-line profiler and per-problem execution context templates
+"""
+
+import builtins
+import contextvars
+import copy
+import dis
+import functools
+import mmap
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from src.core.coverage_map import CoverageData
+
+
+DEFAULT_MAX_OUTPUT_BYTES = 64 * 1024
+DEFAULT_MAX_OUTPUT_LINES = 2000
+DEFAULT_MAX_STEPS = 1_000_000
+
+# Filename given to compiled student code; only these frames are monitored
+STUDENT_FILENAME = '<student>'
+
+TRUNCATION_MARKER = "\n... [output truncated] ...\n"
+
+# Builtins available to student code; print() and input() are added per execution
+SAFE_BUILTINS = {
+    'len': len,
+    'range': range,
+    'enumerate': enumerate,
+    'str': str,
+    'int': int,
+    'float': float,
+    'list': list,
+    'dict': dict,
+    'tuple': tuple,
+    'set': set,
+    'abs': abs,
+    'max': max,
+    'min': min,
+    'sum': sum,
+    'sorted': sorted,
+    'reversed': reversed,
+    'zip': zip,
+    'map': map,
+    'filter': filter,
+    'round': round,
+    'format': format,
+    'EOFError': EOFError
+}
+
+# Builtins a problem may add through its allowedBuiltins metadata; 'input'
+# reads from the run's stdin (empty when the problem has none)
+OPTIONAL_BUILTINS = {
+    name: getattr(builtins, name) for name in (
+        'all', 'any', 'bool', 'chr', 'divmod', 'isinstance', 'iter', 'next', 'ord',
+        'pow', 'repr', 'type', 'Exception', 'IndexError', 'KeyError', 'StopIteration',
+        'TypeError', 'ValueError', 'ZeroDivisionError'
+    )
+}
+
+# Steps between checks of the cancel event and memory limit
+CHECK_INTERVAL = 256
+
+# threading.Event set by the caller to stop executions started in this context
+cancel_event = contextvars.ContextVar('cancel_event', default=None)
+
+# ExecutionContext for executions started in this context (None = DEFAULT_CONTEXT)
+execution_context = contextvars.ContextVar('execution_context', default=None)
+
+
+class OutputLimitExceeded(Exception):
+    """Raised when a program prints more than the capture allows"""
+
+    def __init__(self, message, output=''):
+        super().__init__(message)
+        self.output = output
+
+
+class ExecutionBudgetExceeded(Exception):
+    """Raised when a program executes more steps than its budget"""
+
+
+class MemoryLimitExceeded(Exception):
+    """Raised when a program's traced allocations pass its memory limit"""
+
+
+class ExecutionCancelled(BaseException):
+    """
+    Raised inside a run whose cancel event was set
+    A BaseException so neither the grader nor student code catches it as an error
+    """
+
+
+class CappedOutput:
+    """
+    Text sink with a byte and line cap
+
+    Keeps the head and tail of what was written (never more than the cap in
+    total) and raises OutputLimitExceeded on the write that crosses the cap
+    and on every write after it.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_OUTPUT_BYTES, max_lines=DEFAULT_MAX_OUTPUT_LINES):
+        self.max_bytes = max_bytes
+        self.max_lines = max_lines
+        self.bytes_written = 0
+        self.lines_written = 0
+        self.exceeded = False
+        self._head = []
+        self._head_size = 0
+        self._tail = deque()
+        self._tail_size = 0
+        self._dropped = False
+
+    def write(self, text):
+        """Write text, raising OutputLimitExceeded once the cap is crossed"""
+        if self.exceeded:
+            raise self._limit_error()
+
+        length = len(text)
+        size = len(text.encode('utf-8', 'replace'))
+        self.bytes_written += size
+        self.lines_written += text.count('\n')
+
+        # Retention is measured in characters, half for the head and half for the tail
+        budget = self.max_bytes // 2
+        if self._head_size < budget:
+            piece = text[:budget - self._head_size]
+            self._head.append(piece)
+            self._head_size += len(piece)
+            text = text[len(piece):]
+        if text:
+            if len(text) > budget:
+                text = text[-budget:]
+                self._dropped = True
+            self._tail.append(text)
+            self._tail_size += len(text)
+            while self._tail_size > budget:
+                dropped = self._tail.popleft()
+                self._tail_size -= len(dropped)
+                self._dropped = True
+
+        if self.bytes_written > self.max_bytes or self.lines_written > self.max_lines:
+            self.exceeded = True
+            raise self._limit_error()
+
+        return length
+
+    def flush(self):
+        """Nothing buffered outside the capture"""
+
+    def getvalue(self):
+        """Captured text, with a marker where the middle was dropped"""
+        head = ''.join(self._head)
+        tail = ''.join(self._tail)
+        if self._dropped:
+            return head + TRUNCATION_MARKER + tail
+        return head + tail
+
+    def check(self):
+        """Raise if the cap was crossed (e.g. the error was swallowed by the program)"""
+        if self.exceeded:
+            raise self._limit_error()
+
+    def _limit_error(self):
+        """Build the Output Limit Exceeded verdict"""
+        if self.lines_written > self.max_lines:
+            reason = f"more than {self.max_lines} lines"
+        else:
+            reason = f"more than {self.max_bytes} bytes"
+        return OutputLimitExceeded(f"Output Limit Exceeded: {reason}", self.getvalue())
+
+
+class DiscardOutput:
+    """Sink that only counts what is written (for runs measured, not compared)"""
+
+    def __init__(self):
+        self.bytes_written = 0
+        self.lines_written = 0
+
+    def write(self, text):
+        self.bytes_written += len(text)
+        self.lines_written += text.count('\n')
+        return len(text)
+
+    def flush(self):
+        """Nothing buffered"""
+
+    def getvalue(self):
+        return ''
+
+    def check(self):
+        """No cap to enforce"""
+
+
+class MemoryTracker:
+    """
+    Measures peak allocation of one run with tracemalloc
+
+    tracemalloc is process-wide, so allocations by other threads would
+    count against the run. Trackers therefore only measure in a process
+    that runs one execution at a time and sets MemoryTracker.exclusive
+    (fork server children do); elsewhere they are inert and peak stays
+    None. Use as a context manager around the run; peak is the highest
+    traced total above what was allocated when it started. A limit is
+    enforced on exit against the peak, and by check() (called from the
+    monitor's step hook) against current allocation, to stop runaway
+    programs early; both raise MemoryLimitExceeded.
+    """
+
+    exclusive = False
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.peak = None
+        self._baseline = 0
+        self._started = False
+        self._active = False
+
+    @property
+    def enforced(self):
+        """Whether a limit applies in this process"""
+        return self.limit is not None and self.exclusive
+
+    def __enter__(self):
+        self._active = self.exclusive
+        if not self._active:
+            return self
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._active:
+            return False
+        self._active = False
+        self.peak = max(tracemalloc.get_traced_memory()[1] - self._baseline, 0)
+        if self._started:
+            tracemalloc.stop()
+        if self.limit is not None and self.peak > self.limit and not isinstance(exc_value, MemoryLimitExceeded):
+            raise self._exceeded()
+        return False
+
+    def check(self):
+        """Raise if current allocation is above the limit"""
+        if self.limit is None or not self._active:
+            return
+        current = tracemalloc.get_traced_memory()[0] - self._baseline
+        if current > self.limit:
+            raise self._exceeded()
+
+    def _exceeded(self):
+        return MemoryLimitExceeded(f"Memory Limit Exceeded: more than {format_bytes(self.limit)} allocated")
+
+
+def format_bytes(size):
+    """Readable size, e.g. '512 B', '12.5 KB', '3.0 MB'"""
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def make_print(sink):
+    """
+    Build a print() bound to one execution's sink
+    Writes go to sink unless the program passes file= itself
+    """
+    def sandbox_print(*args, sep=' ', end='\n', file=None, flush=False):
+        builtins.print(*args, sep=sep, end=end, file=sink if file is None else file, flush=flush)
+    return sandbox_print
+
+
+def parse_builtins(text):
+    """
+    Parse an allowedBuiltins list like 'any, isinstance, input'
+
+    Returns sorted list of names; raises ValueError for names that are
+    neither safe builtins nor in OPTIONAL_BUILTINS
+    """
+    names = sorted({part.strip() for part in (text or '').split(',') if part.strip()})
+    for name in names:
+        if name not in SAFE_BUILTINS and name not in OPTIONAL_BUILTINS and name != 'input':
+            raise ValueError(f"Builtin not allowed in the sandbox: {name}")
+    return names
+
+
+class ExecutionContext:
+    """
+    Globals template for one problem profile
+
+    Built once from the allowed builtins, preloaded data and recursion
+    limit; every run gets a shallow copy of the builtins with its own
+    print() (and input()), plus a deep copy of the preloaded data so no
+    run sees another's mutations.
+    """
+
+    def __init__(self, allowed_builtins=(), preloaded=None, recursion_limit=None):
+        """
+        Args:
+            allowed_builtins: Names added to SAFE_BUILTINS (see parse_builtins)
+            preloaded: Dict of global variables every run starts with
+            recursion_limit: Maximum nested calls of student functions (None = Python's own)
+        """
+        self.builtins = dict(SAFE_BUILTINS)
+        for name in allowed_builtins:
+            if name in OPTIONAL_BUILTINS:
+                self.builtins[name] = OPTIONAL_BUILTINS[name]
+        self.allows_input = 'input' in allowed_builtins
+        self.preloaded = dict(preloaded or {})
+        self.recursion_limit = recursion_limit
+        self.key = (tuple(sorted(allowed_builtins)), repr(sorted(self.preloaded.items())), recursion_limit)
+
+    def new_globals(self, sink, feeder=None):
+        """
+        Fresh globals for one run whose print() writes to sink
+
+        feeder serves input(); problems that allow input() without stdin
+        get an empty one, so input() raises EOFError.
+        """
+        run_builtins = self.builtins.copy()
+        run_builtins['print'] = make_print(sink)
+        if feeder is None and self.allows_input:
+            feeder = InputFeeder('')
+        if feeder is not None:
+            run_builtins['input'] = make_input(feeder, sink)
+        namespace = {'__builtins__': run_builtins}
+        if self.preloaded:
+            namespace.update(copy.deepcopy(self.preloaded))
+        return namespace
+
+
+def current_context():
+    """The ExecutionContext of the calling context"""
+    return execution_context.get() or DEFAULT_CONTEXT
+
+
+class InputFeeder:
+    """
+    Serves stdin to input() one line at a time
+
+    data may be a str, bytes or a memory map; lines are found on demand, so
+    large inputs are never split or copied up front. Iterating yields the
+    remaining lines, so a mapped file can also be compared line by line.
+    """
+
+    def __init__(self, data):
+        self._data = data
+        self._newline = '\n' if isinstance(data, str) else b'\n'
+        self._position = 0
+        self._file = None
+
+    @classmethod
+    def from_file(cls, path):
+        """Memory-map a test data file (read only)"""
+        f = open(path, 'rb')
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            data = b''      # empty files cannot be mapped
+        feeder = cls(data)
+        feeder._file = f
+        return feeder
+
+    def readline(self):
+        """Next line without its newline, or None at end of input"""
+        if self._position >= len(self._data):
+            return None
+        end = self._data.find(self._newline, self._position)
+        if end < 0:
+            end = len(self._data)
+        line = self._data[self._position:end]
+        self._position = end + 1
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        return line.rstrip('\r')
+
+    def __iter__(self):
+        line = self.readline()
+        while line is not None:
+            yield line
+            line = self.readline()
+
+    def close(self):
+        """Release the memory map and file, if any"""
+        if self._file is not None:
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def make_input(feeder, sink):
+    """
+    Build an input() reading from feeder
+    The prompt goes to sink like print(); EOFError when input runs out
+    """
+    def sandbox_input(prompt=''):
+        if prompt:
+            sink.write(str(prompt))
+        line = feeder.readline()
+        if line is None:
+            raise EOFError("EOF when reading a line")
+        return line
+    return sandbox_input
+
+
+class ExecutionMonitor:
+    """
+    Counts executed steps of student code and enforces a budget
+
+    A step is a line event; sys.settrace also reports one for each
+    backward jump, and under sys.monitoring a backward jump within a single
+    line counts instead, so a loop costs one step per line per iteration
+    however it is laid out. Counts depend only on the code, never on how
+    busy the machine is. Uses sys.monitoring on Python 3.12+ and a
+    thread-local sys.settrace before.
+
+    With profile=True it also records hits and time per line; the time
+    between two line events is charged to the earlier line.
+
+    If the cancel_event context variable holds an event when the monitor is
+    created, the run raises ExecutionCancelled soon after it is set. A
+    MemoryTracker with a limit is checked on the same schedule.
+
+    recursion_limit caps nested calls of student functions with a
+    RecursionError; it can only be lower than Python's own limit.
+
+    With coverage=True it records executed lines and branch outcomes in
+    self.coverage (a CoverageData).
+    """
+
+    def __init__(self, max_steps=DEFAULT_MAX_STEPS, profile=False, count=False, memory=None,
+                 recursion_limit=None, coverage=False):
+        self.max_steps = max_steps
+        self.count = count      # count steps even without a budget
+        self.recursion_limit = recursion_limit
+        self.coverage = None
+        if coverage:
+            self.coverage = CoverageData('branch' if _monitoring is not None else 'arc')
+        self.steps = 0
+        self.cancel_event = cancel_event.get()
+        self.memory = memory if memory is not None and memory.enforced else None
+        self.profile = {} if profile else None     # lineno -> [hits, seconds]
+        self._last_line = None
+        self._last_time = 0.0
+
+    def on_step(self):
+        """Count one step and stop the program once the budget is used up"""
+        self.steps += 1
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise ExecutionBudgetExceeded(
+                f"Too Slow: exceeded the execution budget of {self.max_steps} steps"
+            )
+        if not self.steps % CHECK_INTERVAL:
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise ExecutionCancelled()
+            if self.memory is not None:
+                self.memory.check()
+
+    def on_call(self, frame):
+        """Called when a student frame starts; enforces the recursion limit"""
+        depth = 0
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == STUDENT_FILENAME and code.co_name != '<module>':
+                depth += 1
+            frame = frame.f_back
+        if depth > self.recursion_limit:
+            raise RecursionError(
+                f"maximum recursion depth exceeded (this problem allows {self.recursion_limit} nested calls)"
+            )
+
+    def on_line(self, code, lineno):
+        """Called for every line event in student code"""
+        self.on_step()
+        if self.coverage is not None:
+            self.coverage.lines.add(lineno)
+        if self.profile is not None:
+            now = time.perf_counter()
+            self._charge_last_line(now)
+            entry = self.profile.get(lineno)
+            if entry is None:
+                entry = self.profile[lineno] = [0, 0.0]
+            entry[0] += 1
+            self._last_line = lineno
+            self._last_time = now
+
+    def _charge_last_line(self, now):
+        """Add the time since the previous line event to that line"""
+        if self._last_line is not None:
+            self.profile[self._last_line][1] += now - self._last_time
+
+    def line_profile(self):
+        """Profile as {lineno: {'hits': int, 'time': seconds}}, or None when off"""
+        if self.profile is None:
+            return None
+        return {
+            lineno: {'hits': hits, 'time': seconds}
+            for lineno, (hits, seconds) in sorted(self.profile.items())
+        }
+
+    @property
+    def active(self):
+        """Whether anything needs events (untraced runs pay no overhead)"""
+        return (self.max_steps is not None or self.profile is not None or self.count
+                or self.cancel_event is not None or self.memory is not None
+                or self.recursion_limit is not None or self.coverage is not None)
+
+    def run(self, code_object, namespace, extra_code=()):
+        """
+        Execute code_object in namespace while monitoring student frames
+        extra_code lists code objects defined earlier that this run may call
+        (e.g. a function from a module that was executed before)
+        """
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ExecutionCancelled()
+        try:
+            if not self.active:
+                exec(code_object, namespace)
+            elif _monitoring is not None:
+                _monitoring.run(self, code_object, namespace, extra_code)
+            else:
+                self._run_settrace(code_object, namespace, extra_code)
+        finally:
+            if self.profile is not None:
+                self._charge_last_line(time.perf_counter())
+                self._last_line = None
+
+    def _run_settrace(self, code_object, namespace, extra_code=()):
+        """Fallback for Python < 3.12: trace only frames of student code"""
+        on_line = self.on_line
+        on_call = self.on_call if self.recursion_limit is not None else None
+        coverage = self.coverage
+        on_frame_line = coverage.on_frame_line if coverage is not None else None
+
+        # Backward jumps report a line event too, so one-line loops count every iteration
+        def local_trace(frame, event, arg):
+            if event == 'line':
+                on_line(frame.f_code, frame.f_lineno)
+                if on_frame_line is not None:
+                    on_frame_line(frame, frame.f_lineno)
+            elif event == 'return' and coverage is not None:
+                coverage.on_frame_exit(frame)
+            return local_trace
+
+        def global_trace(frame, event, arg):
+            if frame.f_code.co_filename == STUDENT_FILENAME:
+                if on_call is not None:
+                    on_call(frame)
+                return local_trace
+            return None
+
+        previous = sys.gettrace()
+        sys.settrace(global_trace)
+        try:
+            exec(code_object, namespace)
+        finally:
+            sys.settrace(previous)
+
+
+class _MonitoringBackend:
+    """Shared sys.monitoring tool; events are routed to the calling thread's monitor"""
+
+    def __init__(self):
+        self.tool_id = None
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def _acquire_tool(self):
+        """Claim a free tool id and register callbacks once per process"""
+        with self.lock:
+            if self.tool_id is not None:
+                return
+            for tool_id in range(6):
+                try:
+                    sys.monitoring.use_tool_id(tool_id, 'its-sandbox')
+                except ValueError:
+                    continue
+                events = sys.monitoring.events
+                sys.monitoring.register_callback(tool_id, events.LINE, self._on_line)
+                sys.monitoring.register_callback(tool_id, events.JUMP, self._on_jump)
+                sys.monitoring.register_callback(tool_id, events.PY_START, self._on_start)
+                sys.monitoring.register_callback(tool_id, events.BRANCH, self._on_branch)
+                self.tool_id = tool_id
+                return
+            raise RuntimeError("No free sys.monitoring tool id")
+
+    def _on_line(self, code, lineno):
+        monitor = getattr(self.local, 'monitor', None)
+        if monitor is not None:
+            monitor.on_line(code, lineno)
+
+    def _on_jump(self, code, source, destination):
+        # A loop on one line iterates without LINE events; count its backward jumps
+        monitor = getattr(self.local, 'monitor', None)
+        if monitor is not None and destination < source and source in _one_line_loops(code):
+            monitor.on_step()
+
+    def _on_start(self, code, offset):
+        monitor = getattr(self.local, 'monitor', None)
+        if monitor is not None and monitor.recursion_limit is not None:
+            monitor.on_call(sys._getframe(1))
+
+    def _on_branch(self, code, source, destination):
+        monitor = getattr(self.local, 'monitor', None)
+        if monitor is not None and monitor.coverage is not None:
+            monitor.coverage.on_branch(code, source, destination)
+
+    def run(self, monitor, code_object, namespace, extra_code=()):
+        """Enable events on the student's code objects only, then execute"""
+        self._acquire_tool()
+        events = sys.monitoring.events
+        wanted = events.LINE | events.JUMP
+        if monitor.recursion_limit is not None:
+            wanted |= events.PY_START
+        if monitor.coverage is not None:
+            wanted |= events.BRANCH
+        code_objects = [
+            code for root in (code_object, *extra_code) for code in _walk_code(root)
+            if code.co_filename == STUDENT_FILENAME
+        ]
+        for code in code_objects:
+            sys.monitoring.set_local_events(self.tool_id, code, wanted)
+        previous = getattr(self.local, 'monitor', None)
+        self.local.monitor = monitor
+        try:
+            exec(code_object, namespace)
+        finally:
+            self.local.monitor = previous
+            for code in code_objects:
+                sys.monitoring.set_local_events(self.tool_id, code, 0)
+
+
+@functools.lru_cache(maxsize=1024)
+def _one_line_loops(code):
+    """Offsets of backward jumps whose whole loop (target through jump) is on one line"""
+    instructions = list(dis.get_instructions(code))
+    lines = [instruction.positions.lineno for instruction in instructions]
+    index_of = {instruction.offset: index for index, instruction in enumerate(instructions)}
+    offsets = set()
+    for index, instruction in enumerate(instructions):
+        target = instruction.argval
+        if 'JUMP' not in instruction.opname or not isinstance(target, int) or target > instruction.offset:
+            continue
+        body = {line for line in lines[index_of[target]:index + 1] if line is not None}
+        if len(body) == 1:
+            offsets.add(instruction.offset)
+    return frozenset(offsets)
+
+
+def _walk_code(code_object):
+    """Yield a code object and every code object nested in it"""
+    yield code_object
+    for const in code_object.co_consts:
+        if isinstance(const, type(code_object)):
+            yield from _walk_code(const)
+
+
+_monitoring = _MonitoringBackend() if hasattr(sys, 'monitoring') else None
+
+DEFAULT_CONTEXT = ExecutionContext()
@@ -0,0 +1,246 @@
+"""
+Similarity Index - Find near-duplicate submissions without comparing all pairs
+Winnowed AST k-gram fingerprints, MinHash signatures and LSH buckets persisted as JSON
+"""
+
+import ast
+import base64
+import builtins
+import hashlib
+import json
+import os
+import random
+import threading
+from array import array
+
+
+KGRAM = 5            # AST tokens per k-gram
+WINDOW = 4           # k-grams per winnowing window
+NUM_PERM = 64        # MinHash permutations
+BANDS = 16           # LSH bands (NUM_PERM // BANDS rows each)
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_BUILTIN_NAMES = set(dir(builtins))
+
+
+def ast_tokens(code):
+    """
+    Normalized pre-order AST tokens of code, or None if it does not parse
+
+    Node types stand in for the code, so renaming variables, reformatting
+    or editing comments changes nothing; builtin names and attribute names
+    (print, enumerate, .items) are kept because they decide what a loop does.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    tokens = []
+    _collect_tokens(tree, tokens)
+    return tokens
+
+
+def _collect_tokens(node, tokens):
+    """Append the tokens of node and its children in source order"""
+    token = type(node).__name__
+    if isinstance(node, ast.Name) and node.id in _BUILTIN_NAMES:
+        token += ':' + node.id
+    elif isinstance(node, ast.Attribute):
+        token += ':' + node.attr
+    elif isinstance(node, ast.Constant):
+        token += ':' + type(node.value).__name__
+    tokens.append(token)
+    for child in ast.iter_child_nodes(node):
+        if not isinstance(child, (ast.expr_context, ast.operator, ast.cmpop, ast.unaryop, ast.boolop)):
+            _collect_tokens(child, tokens)
+        else:
+            tokens.append(type(child).__name__)
+
+
+def _hash(text):
+    """Stable 64-bit hash (str hashes change between interpreter runs)"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def winnow(tokens, k=KGRAM, window=WINDOW):
+    """
+    Winnowing fingerprints of a token sequence
+
+    Hashes every k-gram and keeps the minimum of each window of hashes, so
+    any shared run of k + window - 1 tokens yields a shared fingerprint.
+    """
+    if len(tokens) < k:
+        return {_hash(' '.join(tokens))} if tokens else set()
+    hashes = [_hash(' '.join(tokens[i:i + k])) for i in range(len(tokens) - k + 1)]
+    if len(hashes) <= window:
+        return {min(hashes)}
+    return {min(hashes[i:i + window]) for i in range(len(hashes) - window + 1)}
+
+
+class MinHasher:
+    """MinHash signatures from a fixed, seeded family of hash permutations"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+
+    def signature(self, fingerprints):
+        """Minimum permuted hash per permutation (32-bit values)"""
+        if not fingerprints:
+            return array('I', [_MAX_HASH] * self.num_perm)
+        return array('I', [
+            min((a * f + b) % _PRIME for f in fingerprints) & _MAX_HASH
+            for a, b in self.permutations
+        ])
+
+
+def estimate_similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    if not first:
+        return 0.0
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class SimilarityIndex:
+    """
+    MinHash LSH index of submissions, split by problem
+
+    Submissions whose signatures agree on every row of at least one band
+    share a bucket; a query only compares against its buckets' members, so
+    it stays fast as the index grows. Call save() to persist.
+    """
+
+    def __init__(self, index_file='similarity_index.json', num_perm=NUM_PERM, bands=BANDS):
+        """
+        Args:
+            index_file: JSON file to persist to (None keeps the index in memory only)
+            num_perm: MinHash signature length
+            bands: LSH bands; num_perm must divide evenly into them
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.index_file = index_file
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._entries = {}      # submission id -> (problem, signature)
+        self._buckets = {}      # (problem, band, band hash) -> [submission ids]
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def signature(self, code):
+        """MinHash signature of code, or None if it does not parse"""
+        tokens = ast_tokens(code)
+        if tokens is None:
+            return None
+        return self.hasher.signature(winnow(tokens))
+
+    def add(self, submission_id, code, problem=''):
+        """Fingerprint and index a submission; returns False if it does not parse"""
+        signature = self.signature(code)
+        if signature is None:
+            return False
+        self.add_signature(submission_id, signature, problem)
+        return True
+
+    def add_signature(self, submission_id, signature, problem=''):
+        """Index a precomputed signature (e.g. from a grading worker)"""
+        submission_id = str(submission_id)
+        signature = array('I', signature)
+        with self._lock:
+            if submission_id in self._entries:
+                self._remove(submission_id)
+            self._entries[submission_id] = (problem, signature)
+            for key in self._band_keys(signature, problem):
+                self._buckets.setdefault(key, []).append(submission_id)
+
+    def query_similar(self, code, problem='', threshold=0.5, limit=10, exclude=None):
+        """
+        Indexed submissions similar to code
+
+        Args:
+            code: Source to look up
+            problem: Only submissions to this problem are considered
+            threshold: Minimum estimated Jaccard similarity (0..1)
+            limit: Maximum number of matches
+            exclude: Submission id to leave out (e.g. the code's own earlier entry)
+
+        Returns:
+            List of (submission_id, similarity), most similar first
+        """
+        signature = self.signature(code)
+        if signature is None:
+            return []
+        return self.query_signature(signature, problem, threshold, limit, exclude)
+
+    def query_signature(self, signature, problem='', threshold=0.5, limit=10, exclude=None):
+        """query_similar() for a precomputed signature"""
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature, problem):
+                candidates.update(self._buckets.get(key, ()))
+            if exclude is not None:
+                candidates.discard(str(exclude))
+            matches = []
+            for submission_id in candidates:
+                similarity = estimate_similarity(signature, self._entries[submission_id][1])
+                if similarity >= threshold:
+                    matches.append((submission_id, similarity))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
+
+    def _band_keys(self, signature, problem):
+        """Bucket key of each band of a signature"""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            keys.append((problem, band, _hash(','.join(map(str, rows)))))
+        return keys
+
+    def _remove(self, submission_id):
+        """Drop an entry and its bucket memberships (caller holds the lock)"""
+        problem, signature = self._entries.pop(submission_id)
+        for key in self._band_keys(signature, problem):
+            members = self._buckets.get(key)
+            if members and submission_id in members:
+                members.remove(submission_id)
+
+    def _load(self):
+        """Load index from file"""
+        if not self.index_file or not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r') as f:
+                data = json.load(f)
+            if data.get('num_perm') != self.num_perm or data.get('bands') != self.bands:
+                print("Similarity index parameters changed; starting a new index")
+                return
+            for submission_id, (problem, packed) in data.get('entries', {}).items():
+                signature = array('I')
+                signature.frombytes(base64.b64decode(packed))
+                self.add_signature(submission_id, signature, problem)
+        except Exception as e:
+            print(f"Error loading similarity index: {e}")
+
+    def save(self):
+        """Save index to file; buckets are rebuilt from signatures on load"""
+        if not self.index_file:
+            return
+        with self._lock:
+            entries = {
+                submission_id: [problem, base64.b64encode(signature.tobytes()).decode('ascii')]
+                for submission_id, (problem, signature) in self._entries.items()
+            }
+        try:
+            with open(self.index_file, 'w') as f:
+                json.dump({'num_perm': self.num_perm, 'bands': self.bands, 'entries': entries}, f)
+        except Exception as e:
+            print(f"Error saving similarity index: {e}")
@@ -4,119 +4,134 @@ Hybrid approach with Common Mistake Detection
 """
 
 import ast
-import io
-import sys
-import re
-from contextlib import redirect_stdout, redirect_stderr
+import asyncio
+import contextlib
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.mistake_rules import MistakeRuleRegistry
+from src.core.comparators import compare_outputs, DEFAULT_POLICY
+from src.core.diffing import diff_outputs
+from src.core.generators import generate_cases
+from src.core.harness import FunctionHarness
+from src.core.pipeline import ValidationPipeline, StageCache
+from src.core.results import TestResult
+from src.core.result_cache import settings_fingerprint
+from src.core.performance import (
+    assigned_names, strip_input_assignments, fit_exponent, describe_exponent,
+    EXPONENT_TOLERANCE, STEP_RATIO, MIN_STEP_BUDGET
+)
+from src.core.sandbox import (
+    CappedOutput, DiscardOutput, OutputLimitExceeded, ExecutionBudgetExceeded, ExecutionMonitor,
+    MemoryTracker, InputFeeder, ExecutionContext, cancel_event, current_context,
+    DEFAULT_MAX_OUTPUT_BYTES, DEFAULT_MAX_OUTPUT_LINES, DEFAULT_MAX_STEPS, STUDENT_FILENAME
+)
+from src.core.fork_server import ForkServer, RemoteHarness
+
+
+# Characters of an external expected-output file shown in a test result
+DATA_PREVIEW_CHARS = 2000
+
+
+def _file_preview(path):
+    """Start of a test data file for display (the rest is never read)"""
+    with open(path, 'rb') as f:
+        data = f.read(DATA_PREVIEW_CHARS + 1)
+    text = data[:DATA_PREVIEW_CHARS].decode('utf-8', 'replace').strip()
+    return text + "\n..." if len(data) > DATA_PREVIEW_CHARS else text
+
+
+def _text_preview(text):
+    """Start of an output as long as a test data file, for display"""
+    text = text.strip()
+    return text[:DATA_PREVIEW_CHARS].rstrip() + "\n..." if len(text) > DATA_PREVIEW_CHARS else text
 
 
 class CodeValidator:
     """Validates student code submissions with smart error detection"""
     
-    def __init__(self):
-        """Initialize validator"""
+    def __init__(self, mistake_rules=None, max_output_bytes=DEFAULT_MAX_OUTPUT_BYTES,
+                 max_output_lines=DEFAULT_MAX_OUTPUT_LINES, result_cache=None,
+                 max_steps=DEFAULT_MAX_STEPS, isolation=None, max_concurrency=4, executor=None,
+                 stage_cache=None):
+        """
+        Initialize validator
+        
+        Args:
+            mistake_rules: MistakeRuleRegistry to use (defaults to the built-in rules)
+            max_output_bytes: Output cap per execution before "Output Limit Exceeded"
+            max_output_lines: Line cap per execution before "Output Limit Exceeded"
+            result_cache: Optional ResultCache for resubmitted code
+            max_steps: Execution budget in executed lines per run (None = unlimited);
+                exceeding it gives a reproducible "Too Slow" verdict
+            isolation: 'fork' runs each execution, function call and step count
+                in a forked child of a pre-warmed fork server, one server per
+                thread (POSIX only; falls back to in-process). Profiled and
+                coverage runs still execute in-process.
+            max_concurrency: Async validations allowed to run at once
+            executor: concurrent.futures executor for the async API
+                (default: a thread pool of max_concurrency workers)
+            stage_cache: StageCache for pipeline stage outcomes (default: in-memory LRU)
+        """
         self.timeout = 5
+        self.mistake_rules = mistake_rules or MistakeRuleRegistry.default()
+        self.max_output_bytes = max_output_bytes
+        self.max_output_lines = max_output_lines
+        self.result_cache = result_cache
+        self.max_steps = max_steps
+        self.isolated = isolation == 'fork' and ForkServer.available()
+        self._fork_servers = []         # every thread's fork server, for close()
+        self._thread_state = threading.local()
+        # Cached verdicts are only reused by validators with the same limits
+        self.settings_hash = settings_fingerprint({
+            'max_steps': max_steps,
+            'max_output_bytes': max_output_bytes,
+            'max_output_lines': max_output_lines,
+            'isolation': 'fork' if self.isolated else None
+        })
+        self.max_concurrency = max_concurrency
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._semaphore = None          # (event loop, asyncio.Semaphore)
+        self._async_lock = threading.Lock()
+        self._reference_steps = {}      # (solution code, setup, entry function, context) -> steps
+        self._generated_cases = {}      # spec + solution hash -> generated test cases
+        self._contexts = {}             # problem profile -> ExecutionContext
+        self.pipeline = ValidationPipeline(self, stage_cache or StageCache())
+    
+    def close(self):
+        """Stop the fork servers and the async executor, if they were started"""
+        with self._async_lock:
+            servers, self._fork_servers = self._fork_servers, []
+            self._thread_state = threading.local()
+        for server in servers:
+            server.close()
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
     
     def detect_common_mistakes(self, code, problem_concept=None):
         """
-        Analyze code for common mistakes based on patterns
+        Analyze code for common mistakes using the rule registry
         
         Args:
             code: Student's code
             problem_concept: The concept being tested (e.g., 'BasicListIteration')
             
         Returns:
-            List of detected mistake descriptions
+            List of detected mistake dicts with: type, message, line, lineno
         """
-        detected = []
-        code_stripped = code.strip()
-        code_lower = code_stripped.lower()
-        
-        # Pattern 1: Missing colon at end of for statement
-        for_lines = [line for line in code_stripped.split('\n') if line.strip().startswith('for ')]
-        for line in for_lines:
-            line_stripped = line.strip()
-            if ' in ' in line_stripped and not line_stripped.endswith(':'):
-                detected.append({
-                    'type': 'missing_colon',
-                    'message': "Missing colon (:) at the end of the for statement. Python requires a colon to start a code block.",
-                    'line': line_stripped
-                })
-        
-        # Pattern 2: Missing 'in' keyword
-        for line in for_lines:
-            if ' in ' not in line:
-                detected.append({
-                    'type': 'missing_in',
-                    'message': "Missing 'in' keyword in for loop. Correct syntax: for item in collection:",
-                    'line': line.strip()
-                })
-        
-        # Pattern 3: Using index when not needed (for simple iteration)
-        if problem_concept == 'BasicListIteration' or problem_concept == 'StringIteration':
-            if '[i]' in code_stripped or '[index]' in code_stripped:
-                if 'enumerate' not in code_lower:
-                    detected.append({
-                        'type': 'unnecessary_index',
-                        'message': "Using index syntax when not needed. When iterating directly with 'for item in list', the item variable already contains the value.",
-                        'line': None
-                    })
-        
-        # Pattern 4: enumerate() without two variables
-        if 'enumerate' in code_lower:
-            # Check if there's a comma before 'in'
-            enumerate_pattern = r'for\s+(\w+)\s+in\s+enumerate'
-            if re.search(enumerate_pattern, code_lower):
-                detected.append({
-                    'type': 'enumerate_single_var',
-                    'message': "enumerate() returns (index, value) tuples. You must unpack both: for i, item in enumerate(list)",
-                    'line': None
-                })
-        
-        # Pattern 5: .items() without two variables
-        if '.items()' in code_lower:
-            items_pattern = r'for\s+(\w+)\s+in\s+\w+\.items\(\)'
-            if re.search(items_pattern, code_lower):
-                detected.append({
-                    'type': 'items_single_var',
-                    'message': "dict.items() returns (key, value) tuples. You must unpack both: for key, value in dict.items()",
-                    'line': None
-                })
-        
-        # Pattern 6: Using .items() when .keys() or .values() is needed
-        if problem_concept == 'DictKeysIteration' and '.items()' in code_lower:
-            detected.append({
-                'type': 'wrong_method',
-                'message': "Use .keys() to iterate over dictionary keys only, not .items()",
-                'line': None
-            })
+        return self.mistake_rules.detect(code, problem_concept)
         
-        if problem_concept == 'DictValuesIteration' and '.items()' in code_lower:
-            detected.append({
-                'type': 'wrong_method',
-                'message': "Use .values() to iterate over dictionary values only, not .items()",
-                'line': None
-            })
-        
-        # Pattern 7: Incorrect indentation (no indented line after for)
-        lines = code_stripped.split('\n')
-        for i, line in enumerate(lines):
-            if line.strip().startswith('for ') and line.strip().endswith(':'):
-                # Check if next line exists and is indented
-                if i + 1 < len(lines):
-                    next_line = lines[i + 1]
-                    if next_line.strip() and not next_line.startswith((' ', '\t')):
-                        detected.append({
-                            'type': 'indentation',
-                            'message': "Loop body must be indented. Python uses indentation to define code blocks (usually 4 spaces).",
-                            'line': next_line.strip()
-                        })
-        
-        return detected
-        
-    def validate_hybrid(self, student_code, solution_code, expected_output):
+    def validate_hybrid(self, student_code, solution_code, expected_output, comparison=DEFAULT_POLICY):
         """
         Hybrid validation - Check against BOTH solution and expected output
+        comparison selects the output comparison policy (see comparators.py)
         """
         result = {
             'valid': False,
@@ -127,6 +142,8 @@ class CodeValidator:
             'expected_output': expected_output,
             'solution_output': '',
             'actual_output': '',
+            'first_diff_line': None,
+            'diff': None,
             'detected_mistakes': []
         }
         
@@ -145,7 +162,7 @@ class CodeValidator:
             result['solution_output'] = solution_output
             
             # Step 3: Sanity check
-            if solution_output.strip() != expected_output.strip():
+            if not compare_outputs(expected_output, solution_output, comparison)[0]:
                 result['warnings'].append(
                     "Warning: Solution output doesn't match expected output."
                 )
@@ -154,13 +171,9 @@ class CodeValidator:
             student_output = self._execute_code(student_code)
             result['actual_output'] = student_output
             
-            # Step 5: Compare outputs
-            expected_lines = [line.strip() for line in expected_output.strip().split('\n')]
-            solution_lines = [line.strip() for line in solution_output.strip().split('\n')]
-            actual_lines = [line.strip() for line in student_output.strip().split('\n')]
-            
-            matches_expected = (expected_lines == actual_lines)
-            matches_solution = (solution_lines == actual_lines)
+            # Step 5: Compare outputs (stops at the first differing line)
+            matches_expected, diff_line = compare_outputs(expected_output, student_output, comparison)
+            matches_solution = matches_expected or compare_outputs(solution_output, student_output, comparison)[0]
             
             # Step 6: Determine result
             if matches_expected or matches_solution:
@@ -169,10 +182,21 @@ class CodeValidator:
                 result['feedback'].append("Perfect! Your code produces the correct output!")
             else:
                 result['score'] = 0
-                result['feedback'].append("Output doesn't match expected result.")
+                result['first_diff_line'] = diff_line
+                result['diff'] = diff_outputs(expected_output, student_output, comparison)
+                result['feedback'].append(f"Output doesn't match expected result (first difference on line {diff_line}).")
                 # Detect common mistakes for failed submissions
                 result['detected_mistakes'] = self.detect_common_mistakes(student_code)
         
+        except OutputLimitExceeded as e:
+            result['errors'].append(str(e))
+            result['actual_output'] = e.output
+            result['feedback'].append("Your code printed too much output. Check for a loop that never ends.")
+        
+        except ExecutionBudgetExceeded as e:
+            result['errors'].append(str(e))
+            result['feedback'].append("Your code ran too many steps. Check for a loop that never ends.")
+        
         except Exception as e:
             result['errors'].append(f"Runtime Error: {str(e)}")
             result['feedback'].append("Your code produced an error.")
@@ -180,172 +204,494 @@ class CodeValidator:
         
         return result
     
-    def validate_with_test_cases(self, student_code, problem_details, solution_code):
+    def validate_with_test_cases(self, student_code, problem_details, solution_code, profile=False,
+                                 coverage=False):
         """
         Validate with multiple test cases using hybrid method
-        """
-        result = {
-            'valid': False,
-            'score': 0,
-            'tests_passed': 0,
-            'tests_total': 0,
-            'errors': [],
-            'feedback': [],
-            'results': [],
-            'detected_mistakes': []
-        }
+        Identical resubmissions are answered from the result cache when one is set
         
-        # Check syntax first
-        syntax_check = self._check_syntax(student_code)
-        if not syntax_check['valid']:
-            result['errors'] = syntax_check['errors']
-            result['feedback'].append("Fix syntax errors before testing.")
-            result['detected_mistakes'] = self.detect_common_mistakes(
-                student_code, 
-                problem_details.get('concept')
-            )
-            return result
+        With profile=True each test result gets a per-line 'profile' of the
+        student's code ({lineno: {'hits', 'time'}}) and the overall result
+        gets the sum across tests. Profiled runs bypass the cache.
         
-        # Get test cases
-        test_cases = problem_details.get('test_cases', [])
-        result['tests_total'] = len(test_cases)
+        With coverage=True each test result gets the lines and branch
+        outcomes it ran ('coverage') and the overall result gets a merged
+        report (see coverage_map.coverage_report).
         
-        if not test_cases:
-            result['errors'].append("No test cases available.")
-            return result
+        Returns a SubmissionResult (dict-style access; see results.py) whose
+        'results' are TestResults.
+        """
+        if profile:
+            return self._grade_test_cases(student_code, problem_details, solution_code, True, coverage)
         
-        # Run each test case
-        for idx, test_case in enumerate(test_cases):
-            test_result = self._run_hybrid_test(
-                student_code, 
-                solution_code,
-                test_case, 
-                idx + 1
-            )
-            result['results'].append(test_result)
-            
-            if test_result['passed']:
-                result['tests_passed'] += 1
-        
-        # Calculate score
-        if result['tests_total'] > 0:
-            result['score'] = int((result['tests_passed'] / result['tests_total']) * 100)
-            result['valid'] = result['score'] >= 70
-        
-        # Generate feedback
-        if result['valid']:
-            if result['score'] == 100:
-                result['feedback'].insert(0, "Perfect! All tests passed!")
-            else:
-                result['feedback'].insert(0, f"Good job! Passed {result['tests_passed']}/{result['tests_total']} tests.")
-        else:
-            result['feedback'].insert(0, f"Keep trying! Only {result['tests_passed']}/{result['tests_total']} tests passed.")
-            # Detect common mistakes for failed submissions
-            result['detected_mistakes'] = self.detect_common_mistakes(
-                student_code, 
-                problem_details.get('concept')
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.make_key(
+                problem_details, solution_code, student_code, 'coverage' if coverage else None,
+                self.settings_hash
             )
+            if cache_key is not None:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    cached['cached'] = True
+                    return cached
+        
+        result = self._grade_test_cases(student_code, problem_details, solution_code, coverage=coverage)
         
+        if cache_key is not None:
+            self.result_cache.put(cache_key, result)
         return result
     
-    def _run_hybrid_test(self, student_code, solution_code, test_case, test_number):
-        """Run a single test with hybrid validation"""
-        result = {
-            'test_number': test_number,
-            'description': test_case.get('description', f"Test {test_number}"),
-            'passed': False,
-            'expected': '',
-            'actual': '',
-            'solution_output': '',
-            'error': None,
-            'input_used': test_case.get('input', '')
-        }
+    async def validate_hybrid_async(self, student_code, solution_code, expected_output,
+                                    comparison=DEFAULT_POLICY):
+        """Coroutine version of validate_hybrid (see _run_async)"""
+        return await self._run_async(
+            self.validate_hybrid, student_code, solution_code, expected_output, comparison
+        )
+    
+    async def validate_with_test_cases_async(self, student_code, problem_details, solution_code,
+                                             profile=False, coverage=False):
+        """Coroutine version of validate_with_test_cases (see _run_async)"""
+        return await self._run_async(
+            self.validate_with_test_cases, student_code, problem_details, solution_code, profile, coverage
+        )
+    
+    async def _run_async(self, func, *args):
+        """
+        Run a blocking validation on the executor
+        
+        At most max_concurrency validations run at once; callers beyond that
+        wait on a semaphore without holding a thread. Cancelling the awaiting
+        task sets the run's cancel event, so student code stops within a few
+        thousand steps (fork-isolated runs finish under their rlimits instead).
+        """
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore(loop):
+            event = threading.Event()
+            context = contextvars.copy_context()
+            context.run(cancel_event.set, event)
+            future = loop.run_in_executor(
+                self._get_executor(), functools.partial(context.run, func, *args)
+            )
+            try:
+                return await future
+            except asyncio.CancelledError:
+                event.set()
+                raise
+    
+    def _get_executor(self):
+        """Create the default thread pool on first use"""
+        with self._async_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix='validator'
+                )
+            return self._executor
+    
+    def _get_semaphore(self, loop):
+        """Concurrency semaphore for the running event loop"""
+        with self._async_lock:
+            if self._semaphore is None or self._semaphore[0] is not loop:
+                self._semaphore = (loop, asyncio.Semaphore(self.max_concurrency))
+            return self._semaphore[1]
+    
+    def _grade_test_cases(self, student_code, problem_details, solution_code, profile=False, coverage=False):
+        """Run the problem's validation stages for one submission (see pipeline.py)"""
+        return self.pipeline.run(student_code, problem_details, solution_code, profile, coverage)
+    
+    def _run_hybrid_test(self, student_code, solution_code, test_case, test_number,
+                         comparison=DEFAULT_POLICY, profile=False, memory_limit=None,
+                         student_harness=None, solution_harness=None, input_mode='code',
+                         coverage=False):
+        """
+        Run a single test with hybrid validation
+        peak_memory is the student's peak allocation in bytes; memory_limit
+        (bytes) turns a larger allocation into a Memory Limit Exceeded error.
+        Both need a fork-isolated run (see MemoryTracker); in-process runs
+        leave peak_memory None.
+        With harnesses, the test calls their entry functions instead of
+        re-running the programs. In 'stdin' input mode the test input is fed
+        to input() instead of running as setup code. With coverage, the
+        result's 'coverage' holds the lines and branches the student's run hit.
+        
+        A test case's input_file is memory-mapped and served to input() of
+        each run; function problems cannot use it, so such a test fails with
+        an error. Its output_file is the expected output, compared line by
+        line from the mapping without rerunning the solution; the student's
+        output cap grows by the file's size so a matching run fits, and only
+        the start of either output is kept in the result.
+        """
+        input_file = test_case.get('input_file')
+        output_file = test_case.get('output_file')
+        result = TestResult(
+            test_number=test_number,
+            description=test_case.get('description', f"Test {test_number}"),
+            passed=False,
+            expected='',
+            actual='',
+            solution_output='',
+            error=None,
+            first_diff_line=None,
+            diff=None,
+            peak_memory=None,
+            input_used=test_case.get('input') or (f"<{os.path.basename(input_file)}>" if input_file else '')
+        )
+        student_monitor = None
+        memory = MemoryTracker(memory_limit)
         
         try:
             test_input = test_case.get('input', '')
             expected_output = test_case.get('output', '').strip()
+            if input_mode == 'stdin':
+                setup, stdin = None, test_input
+            else:
+                setup, stdin = test_input, None
+            if input_file and student_harness is not None:
+                raise Exception("Test data files (input_file) only work with whole programs, "
+                                "not entry functions")
             
-            # Run solution with test input
-            solution_with_input = f"{test_input}\n{solution_code}"
-            solution_output = self._execute_code(solution_with_input)
-            result['solution_output'] = solution_output.strip()
+            student_sink = None
+            if output_file:
+                size = os.path.getsize(output_file)
+                student_sink = CappedOutput(self.max_output_bytes + size, self.max_output_lines + size)
             
-            # Run student code with test input
-            student_with_input = f"{test_input}\n{student_code}"
-            student_output = self._execute_code(student_with_input)
+            # Run solution with test input (generated cases already carry its output)
+            if test_case.get('generated'):
+                solution_output = test_case['output']
+            elif output_file:
+                solution_output = ''
+            elif solution_harness is not None:
+                solution_output = solution_harness.call(test_input)
+            else:
+                solution_output = self._execute_code(
+                    solution_code, setup=setup, stdin=stdin, stdin_file=input_file
+                )
+            result['solution_output'] = solution_output.strip()
             
-            result['expected'] = expected_output
-            result['actual'] = student_output.strip()
+            # Run student code with test input (profiled and covered runs stay in-process)
+            if profile or coverage:
+                student_monitor = ExecutionMonitor(
+                    self.max_steps, profile=profile, memory=memory, coverage=coverage
+                )
+            if student_harness is not None:
+                student_output = student_harness.call(
+                    test_input, monitor=student_monitor, memory=memory, sink=student_sink
+                )
+            else:
+                student_output = self._execute_code(
+                    student_code, setup=setup, monitor=student_monitor, sink=student_sink, memory=memory,
+                    stdin=stdin, stdin_file=input_file
+                )
             
-            # Compare outputs
-            expected_lines = [line.strip() for line in expected_output.split('\n')]
-            solution_lines = [line.strip() for line in solution_output.strip().split('\n')]
-            actual_lines = [line.strip() for line in student_output.strip().split('\n')]
+            result['expected'] = _file_preview(output_file) if output_file else expected_output
+            result['actual'] = _text_preview(student_output) if output_file else student_output.strip()
             
-            matches_expected = (expected_lines == actual_lines)
-            matches_solution = (solution_lines == actual_lines)
+            # Compare outputs lazily, stopping at the first differing line
+            with self._expected_source(expected_output, output_file) as expected:
+                matches_expected, diff_line = compare_outputs(expected, student_output, comparison)
+            matches_solution = matches_expected or (
+                not output_file and compare_outputs(solution_output, student_output, comparison)[0]
+            )
             
             result['passed'] = matches_expected or matches_solution
+            if not result['passed']:
+                result['first_diff_line'] = diff_line
+                with self._expected_source(expected_output or solution_output, output_file) as expected:
+                    result['diff'] = diff_outputs(expected, student_output, comparison)
+            
+        except OutputLimitExceeded as e:
+            result['error'] = str(e)
+            result['actual'] = _text_preview(e.output) if output_file else e.output.strip()
+            result['passed'] = False
+            # Show where the runaway output first went wrong
+            with self._expected_source(expected_output or result['solution_output'], output_file) as expected:
+                result['diff'] = diff_outputs(expected, e.output, comparison)
             
         except Exception as e:
             result['error'] = str(e)
             result['passed'] = False
         
+        result['peak_memory'] = memory.peak
+        
+        if profile:
+            # Kept on failures too: the profile shows where a slow run spent its time
+            result['profile'] = student_monitor.line_profile() if student_monitor else None
+        
+        if coverage and student_monitor is not None:
+            data = student_monitor.coverage
+            if student_harness is not None and student_harness.load_coverage is not None:
+                # Module-level lines ran once, when the harness loaded the code
+                data.lines |= student_harness.load_coverage.lines
+                data.branches |= student_harness.load_coverage.branches
+            result['coverage'] = data.to_dict()
+        
         return result
     
-    def _execute_code(self, code):
-        """Execute code and return output"""
-        output_buffer = io.StringIO()
-        error_buffer = io.StringIO()
-        
-        safe_globals = {
-            '__builtins__': {
-                'print': print,
-                'len': len,
-                'range': range,
-                'enumerate': enumerate,
-                'str': str,
-                'int': int,
-                'float': float,
-                'list': list,
-                'dict': dict,
-                'tuple': tuple,
-                'set': set,
-                'abs': abs,
-                'max': max,
-                'min': min,
-                'sum': sum,
-                'sorted': sorted,
-                'reversed': reversed,
-                'zip': zip,
-                'map': map,
-                'filter': filter,
-                'round': round,
-                'format': format
-            }
-        }
+    def execution_context(self, problem_details):
+        """
+        ExecutionContext template for a problem, built once per profile
+        Problems with the same builtins, preloaded data and recursion limit share one
+        """
+        allowed = tuple(problem_details.get('allowed_builtins') or ())
+        preloaded = problem_details.get('preloaded_data') or {}
+        recursion_limit = problem_details.get('recursion_limit')
+        key = (allowed, json.dumps(preloaded, sort_keys=True), recursion_limit)
+        context = self._contexts.get(key)
+        if context is None:
+            context = self._contexts[key] = ExecutionContext(allowed, preloaded, recursion_limit)
+        return context
+    
+    def _fork_server(self):
+        """This thread's fork server, so concurrent validations run their children in parallel"""
+        server = getattr(self._thread_state, 'fork_server', None)
+        if server is None:
+            server = ForkServer(self.max_steps, self.max_output_bytes, self.max_output_lines)
+            with self._async_lock:
+                self._fork_servers.append(server)
+            self._thread_state.fork_server = server
+        return server
+    
+    def _harness(self, code, entry_function, in_process=False):
+        """
+        FunctionHarness with this validator's limits
+        When isolated, calls run in fork server children unless in_process
+        (profiled and coverage runs need the harness in this process).
+        """
+        if self.isolated and not in_process:
+            return RemoteHarness(self._fork_server(), code, entry_function)
+        return FunctionHarness(
+            code, entry_function, self.max_steps, self.max_output_bytes, self.max_output_lines
+        )
+    
+    def _generated_test_cases(self, spec, solution_code, entry_function=None):
+        """
+        Test cases generated from an input spec, with expected outputs
+        
+        The reference solution (with its example data stripped) runs once
+        over every generated input; the cases are cached per spec and
+        solution, so later submissions only run the student's code.
+        """
+        if not spec:
+            return []
+        
+        key = hashlib.sha256(
+            json.dumps([spec, solution_code, entry_function, current_context().key], sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        cases = self._generated_cases.get(key)
+        if cases is not None:
+            return cases
+        
+        reference_code = strip_input_assignments(solution_code, set(spec['variables']))
+        harness = self._harness(reference_code, entry_function) if entry_function else None
+        seed = spec.get('seed', 0)
+        cases = []
+        for number, setup in enumerate(generate_cases(spec), start=1):
+            try:
+                if harness is not None:
+                    output = harness.call(setup)
+                else:
+                    output = self._execute_code(reference_code, setup=setup)
+            except Exception:
+                continue    # the reference cannot handle this input; skip it
+            cases.append({
+                'description': f"Random case {number} (seed {seed})",
+                'input': setup,
+                'output': output.strip(),
+                'generated': True
+            })
+        self._generated_cases[key] = cases
+        return cases
+    
+    def _run_performance_test(self, student_code, solution_code, perf_test, test_number,
+                              entry_function=None):
+        """
+        Compare how student and reference step counts grow with input size
         
-        with redirect_stdout(output_buffer), redirect_stderr(error_buffer):
-            exec(code, safe_globals)
+        Runs both on the generated input at each size, fits cost ~ n**k and
+        fails when the student's k is more than EXPONENT_TOLERANCE above the
+        reference's, or a run uses STEP_RATIO times the reference's steps.
+        Only Python lines count as steps: work inside builtins such as
+        list.index or sorted is free, so these tests suit problems whose
+        cost lies in the student's own loops.
+        """
+        result = self._performance_result(perf_test, test_number)
+        generator = perf_test.get('generator', '')
+        
+        # Hard-coded example data would hide the generated input
+        input_names = assigned_names(generator)
+        solution_code = strip_input_assignments(solution_code, input_names)
+        student_code = strip_input_assignments(student_code, input_names)
+        student_harness = self._harness(student_code, entry_function) if entry_function else None
+        
+        try:
+            for size in result['sizes']:
+                setup = f"n = {size}\n{generator}"
+                reference_steps = self._reference_cost(solution_code, setup, entry_function)
+                budget = max(reference_steps * STEP_RATIO, MIN_STEP_BUDGET)
+                try:
+                    student_steps = self._count_steps(student_code, setup, budget, student_harness)
+                except ExecutionBudgetExceeded:
+                    result['error'] = (f"Too Slow at n={size}: more than {STEP_RATIO}x "
+                                       f"the steps of the reference solution")
+                    result['actual'] = "Too Slow"
+                    return result
+                result['reference_steps'].append(reference_steps)
+                result['student_steps'].append(student_steps)
+        except Exception as e:
+            result['error'] = str(e)
+            return result
+        
+        reference_exponent = fit_exponent(result['sizes'], result['reference_steps'])
+        student_exponent = fit_exponent(result['sizes'], result['student_steps'])
+        result['reference_exponent'] = reference_exponent
+        result['student_exponent'] = student_exponent
+        result['expected'] = f"{describe_exponent(reference_exponent)} or better"
+        result['actual'] = describe_exponent(student_exponent)
+        
+        if reference_exponent is None or student_exponent is None:
+            result['passed'] = True
+        else:
+            result['passed'] = student_exponent <= reference_exponent + EXPONENT_TOLERANCE
+            if not result['passed']:
+                result['error'] = "Grows faster than the reference solution as the input gets bigger"
+        return result
+    
+    @staticmethod
+    def _performance_result(perf_test, test_number):
+        """Empty TestResult for a performance test"""
+        return TestResult(
+            test_number=test_number,
+            kind='performance',
+            description=perf_test.get('description', f"Performance test {test_number}"),
+            passed=False,
+            expected='',
+            actual='',
+            solution_output='',
+            error=None,
+            first_diff_line=None,
+            diff=None,
+            peak_memory=None,
+            input_used=perf_test.get('generator', ''),
+            sizes=list(perf_test.get('sizes', [])),
+            reference_steps=[],
+            student_steps=[],
+            reference_exponent=None,
+            student_exponent=None
+        )
+    
+    def _reference_cost(self, solution_code, setup, entry_function=None):
+        """Steps the reference solution takes on setup (memoized; it never changes)"""
+        key = (solution_code, setup, entry_function, current_context().key)
+        steps = self._reference_steps.get(key)
+        if steps is None:
+            harness = self._harness(solution_code, entry_function) if entry_function else None
+            steps = self._reference_steps[key] = self._count_steps(solution_code, setup, None, harness)
+        return steps
+    
+    def _count_steps(self, code, setup, max_steps, harness=None):
+        """
+        Run code on setup with output discarded and return its step count
+        With a harness, only the entry function call is counted
+        """
+        monitor = ExecutionMonitor(max_steps, count=True)
+        if harness is not None:
+            harness.call(setup, monitor=monitor, sink=DiscardOutput())
+        else:
+            self._execute_code(code, setup=setup, monitor=monitor, sink=DiscardOutput())
+        return monitor.steps
+    
+    @staticmethod
+    def _merge_profiles(test_results):
+        """Sum per-line profiles across test results"""
+        merged = {}
+        for test_result in test_results:
+            for lineno, stats in (test_result.get('profile') or {}).items():
+                entry = merged.setdefault(lineno, {'hits': 0, 'time': 0.0})
+                entry['hits'] += stats['hits']
+                entry['time'] += stats['time']
+        return dict(sorted(merged.items()))
+    
+    @staticmethod
+    def _expected_source(expected_output, output_file=None):
+        """Context giving the expected output: the text, or lines of the mapped output_file"""
+        if output_file:
+            return InputFeeder.from_file(output_file)
+        return contextlib.nullcontext(expected_output)
+    
+    def _execute_code(self, code, setup=None, monitor=None, sink=None, memory=None, stdin=None,
+                      stdin_file=None):
+        """
+        Execute code and return output
+        Raises OutputLimitExceeded when the output cap is crossed and
+        ExecutionBudgetExceeded when it runs more than max_steps lines
         
-        error_output = error_buffer.getvalue()
-        if error_output:
-            raise Exception(error_output)
+        setup (e.g. a test input) runs first in the same globals, unmonitored.
+        monitor is an ExecutionMonitor to run under (default: step budget only).
+        sink replaces the capped output capture (e.g. DiscardOutput).
+        memory is a MemoryTracker that measures (and limits) the run's allocations.
+        stdin (a string or InputFeeder) is served to the program's input();
+        stdin_file instead memory-maps a data file for it, so runs in worker
+        processes or forked children share the file's pages.
+        Globals come from the current ExecutionContext (see execution_context).
+        Output goes to a per-execution sink through an injected print(), so
+        sys.stdout is never swapped and concurrent executions stay separate.
+        When isolated, executions run in a forked child, except those
+        ForkServer.supports() rules out (profiles, coverage, InputFeeders).
+        """
+        if self.isolated and ForkServer.supports(monitor, stdin, sink):
+            return self._fork_server().execute(
+                code, setup, memory, stdin, stdin_file, monitor=monitor, sink=sink
+            )
+        
+        output_buffer = sink or CappedOutput(self.max_output_bytes, self.max_output_lines)
+        
+        context = current_context()
+        feeder = None
+        if stdin_file is not None:
+            feeder = InputFeeder.from_file(stdin_file)
+        elif stdin is not None:
+            feeder = stdin if isinstance(stdin, InputFeeder) else InputFeeder(stdin)
+        try:
+            safe_globals = context.new_globals(output_buffer, feeder)
+            
+            if setup:
+                exec(compile(setup, '<input>', 'exec'), safe_globals)
+            
+            if monitor is None:
+                monitor = ExecutionMonitor(self.max_steps, memory=memory, recursion_limit=context.recursion_limit)
+            elif monitor.recursion_limit is None:
+                monitor.recursion_limit = context.recursion_limit
+            code_object = compile(code, STUDENT_FILENAME, 'exec')
+            try:
+                with memory if memory is not None else contextlib.nullcontext():
+                    monitor.run(code_object, safe_globals)
+            except Exception:
+                # The limit verdict wins over errors raised after it was crossed
+                output_buffer.check()
+                raise
+        finally:
+            if stdin_file is not None:
+                feeder.close()
+        
+        # The program may have swallowed the limit error with a bare except
+        output_buffer.check()
         
         return output_buffer.getvalue()
     
     def _check_syntax(self, code):
-        """Check Python syntax"""
+        """Check Python syntax (line is the offending line number, if known)"""
         try:
             ast.parse(code)
-            return {'valid': True, 'errors': []}
+            return {'valid': True, 'errors': [], 'line': None}
         except SyntaxError as e:
             return {
                 'valid': False,
-                'errors': [f"Syntax Error on line {e.lineno}: {e.msg}"]
+                'errors': [f"Syntax Error on line {e.lineno}: {e.msg}"],
+                'line': e.lineno
             }
         except Exception as e:
             return {
                 'valid': False,
-                'errors': [f"Parse Error: {str(e)}"]
+                'errors': [f"Parse Error: {str(e)}"],
+                'line': None
             }
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Batch Grading Entry Point - Regrade submissions without the GUI
+
+Usage:
+    python src/grade.py submissions.jsonl -o results.jsonl
+    python src/grade.py submissions_dir/ --workers 8
+    python src/grade.py submissions.jsonl --similarity-index similarity_index.json
+    python src/grade.py submissions.jsonl --clusters wrong_answers.json
+    python src/grade.py submissions.jsonl --format binary -o results.bin
+"""
+
+import argparse
+import sys
+import os
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from src.core.ontology_manager import OntologyManager
+from src.core.batch_grader import load_problem_table, read_submissions, grade_all, OUTPUT_FORMATS
+from src.core.similarity import SimilarityIndex
+from src.core.clustering import WrongAnswerClusters
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Grade submissions headlessly")
+    parser.add_argument('source', help="JSONL file or directory of submissions")
+    parser.add_argument('-o', '--output', default='-', help="Results file (default: stdout)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='jsonl',
+                        help="jsonl, or binary for compact length-prefixed records")
+    parser.add_argument('--ontology', default=os.path.join(parent_dir, 'python_iteration_tutor.owl'),
+                        help="Path to the ontology file")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunksize', type=int, default=16, help="Submissions per worker task")
+    parser.add_argument('--isolate', action='store_true',
+                        help="Run every test, function call and performance run in a forked "
+                             "child process (POSIX only)")
+    parser.add_argument('--similarity-index', default=None, metavar='PATH',
+                        help="Add submissions to this near-duplicate index and report matches")
+    parser.add_argument('--clusters', default=None, metavar='PATH',
+                        help="Group failing submissions by output here and print the top 10 per problem")
+    args = parser.parse_args()
+
+    try:
+        manager = OntologyManager(args.ontology)
+    except FileNotFoundError as e:
+        print(f"✕ ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    problems = load_problem_table(manager)
+    submissions = read_submissions(args.source)
+
+    clusters = WrongAnswerClusters(args.clusters) if args.clusters else None
+
+    binary = args.format == 'binary'
+    if args.output == '-':
+        output = sys.stdout.buffer if binary else sys.stdout
+    else:
+        output = open(args.output, 'wb' if binary else 'w')
+    try:
+        summary = grade_all(
+            problems, submissions, output, args.workers, args.chunksize,
+            mistakes=manager.get_common_mistakes(),
+            isolation='fork' if args.isolate else None,
+            similarity_index=SimilarityIndex(args.similarity_index) if args.similarity_index else None,
+            clusters=clusters,
+            output_format=args.format
+        )
+    finally:
+        if args.output != '-':
+            output.close()
+
+    print(f"✓ Graded {summary['count']} submissions in {summary['elapsed']:.2f}s "
+          f"({summary['throughput']:.1f} submissions/sec)", file=sys.stderr)
+
+    if clusters is not None:
+        print_clusters(clusters)
+
+
+def print_clusters(clusters, limit=10):
+    """Print the most common wrong answers of each problem to stderr"""
+    for problem_name in clusters.problems():
+        print(f"\n{problem_name}: top wrong answers", file=sys.stderr)
+        for rank, cluster in enumerate(clusters.top(problem_name, limit), start=1):
+            mistakes = ', '.join(cluster['mistakes']) or 'none detected'
+            print(f"  {rank}. {cluster['count']} submissions, score {cluster['score']}%, "
+                  f"e.g. {cluster['representative_id']} (mistakes: {mistakes})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
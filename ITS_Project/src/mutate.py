@@ -0,0 +1,58 @@
+"""
+Mutation Testing Entry Point - Find weak problem test suites
+
+Usage:
+    python src/mutate.py
+    python src/mutate.py --problem Problem3 --workers 8
+    python src/mutate.py -o mutation_report.json
+"""
+
+import argparse
+import json
+import sys
+import os
+
+# Add parent directory to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from src.core.ontology_manager import OntologyManager
+from src.core.batch_grader import load_problem_table
+from src.core.mutation import run_mutation_tests
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Mutate reference solutions and report mutants the tests miss")
+    parser.add_argument('--ontology', default=os.path.join(parent_dir, 'python_iteration_tutor.owl'),
+                        help="Path to the ontology file")
+    parser.add_argument('--problem', action='append', default=None,
+                        help="Only this problem (repeatable; default: all)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('-o', '--output', default=None, help="Also write the full report as JSON")
+    args = parser.parse_args()
+
+    try:
+        manager = OntologyManager(args.ontology)
+    except FileNotFoundError as e:
+        print(f"✕ ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    report = run_mutation_tests(load_problem_table(manager), args.workers, problem_names=args.problem)
+
+    for name, problem_report in sorted(report['problems'].items()):
+        score = '-' if problem_report['score'] is None else f"{problem_report['score']}%"
+        print(f"{name}: {problem_report['killed']}/{problem_report['mutants']} mutants killed ({score})")
+        for survivor in problem_report['survivors']:
+            print(f"  survived: {survivor['description']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"✓ Ran {report['count']} mutants in {report['elapsed']:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
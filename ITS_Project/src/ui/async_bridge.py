@@ -0,0 +1,68 @@
+"""
+Async Bridge - Run coroutines from the Tk main loop
+An asyncio loop lives on a daemon thread; results come back through after() polling
+"""
+
+import asyncio
+import threading
+
+
+class AsyncBridge:
+    """Runs coroutines on a background event loop and calls back on the Tk thread"""
+
+    POLL_MS = 50
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name='async-bridge', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls):
+        """One bridge for the whole app, started on first use"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _run_loop(self):
+        """Background thread: serve the event loop forever"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, widget, coroutine, on_done, on_error=None):
+        """
+        Schedule a coroutine and report back on the Tk thread
+
+        Args:
+            widget: Any widget; polling runs through its after() and stops
+                (cancelling the coroutine) once it is destroyed
+            coroutine: Coroutine to run on the background loop
+            on_done: Called with the result on the Tk thread
+            on_error: Called with the exception on the Tk thread
+
+        Returns:
+            concurrent.futures.Future; cancel() it to cancel the coroutine
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+        def poll():
+            if not widget.winfo_exists():
+                future.cancel()
+                return
+            if not future.done():
+                widget.after(self.POLL_MS, poll)
+                return
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is None:
+                on_done(future.result())
+            elif on_error is not None:
+                on_error(error)
+
+        widget.after(self.POLL_MS, poll)
+        return future
@@ -0,0 +1,122 @@
+"""
+Live Checker - Background syntax and mistake checks while typing
+Debounced, hashed and run on a worker thread so keystrokes never wait
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from src.ui.styles import Colors
+
+
+class LiveChecker:
+    """Checks the editor contents after each pause in typing"""
+
+    DELAY_MS = 600
+    POLL_MS = 50
+    TAG = 'live_issue'
+
+    def __init__(self, editor, status_label, validator, concept=None, delay=DELAY_MS):
+        """
+        Bind a checker to an editor
+
+        Args:
+            editor: CTkTextbox holding the student's code
+            status_label: CTkLabel that shows the latest check result
+            validator: CodeValidator used for _check_syntax and mistake detection
+            concept: Problem concept passed to the mistake detector
+            delay: Pause in milliseconds before a check starts
+        """
+        self.editor = editor
+        self.status_label = status_label
+        self.validator = validator
+        self.concept = concept
+        self.delay = delay
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._after_id = None
+        self._running = None        # (digest, future) of the check in flight
+        self._last_digest = None
+        self._closed = False
+
+        self.editor.tag_config(self.TAG, background=Colors.DANGER_SUBTLE)
+        self.editor.bind('<KeyRelease>', self._on_key, add=True)
+        self.editor.bind('<Destroy>', self._on_destroy, add=True)
+
+    def _on_key(self, event=None):
+        """Restart the debounce timer on every keystroke"""
+        if self._after_id is not None:
+            self.editor.after_cancel(self._after_id)
+        self._after_id = self.editor.after(self.delay, self._start_check)
+
+    def _start_check(self):
+        """Hand the current text to the worker unless it was already checked"""
+        self._after_id = None
+        if self._closed or self._running is not None:
+            # A check is in flight; _poll restarts us when it finishes
+            return
+
+        code = self.editor.get('1.0', 'end-1c')
+        digest = hashlib.sha1(code.encode('utf-8')).hexdigest()
+        if digest == self._last_digest:
+            return
+
+        self._running = (digest, self._executor.submit(self._check, code))
+        self.editor.after(self.POLL_MS, self._poll)
+
+    def _check(self, code):
+        """Worker thread: syntax check and mistake detection"""
+        syntax = self.validator._check_syntax(code)
+        mistakes = self.validator.detect_common_mistakes(code, self.concept)
+        return {'syntax': syntax, 'mistakes': mistakes}
+
+    def _poll(self):
+        """Main thread: wait for the worker, then paint"""
+        if self._closed:
+            return
+
+        digest, future = self._running
+        if not future.done():
+            self.editor.after(self.POLL_MS, self._poll)
+            return
+
+        self._running = None
+        self._last_digest = digest
+        if future.exception() is None:
+            self._paint(future.result())
+
+        # Text may have changed while the worker was busy
+        self._start_check()
+
+    def _paint(self, result):
+        """Show the result in the status label and mark the offending line"""
+        self.editor.tag_remove(self.TAG, '1.0', 'end')
+
+        syntax = result['syntax']
+        mistakes = result['mistakes']
+
+        if not syntax['valid']:
+            text, color, lineno = syntax['errors'][0], Colors.DANGER, syntax.get('line')
+        elif mistakes:
+            text, color, lineno = mistakes[0]['message'], Colors.WARNING, mistakes[0].get('lineno')
+        else:
+            text, color, lineno = "✓ No issues found", Colors.SUCCESS, None
+
+        if len(text) > 60:
+            text = text[:60] + "..."
+        self.status_label.configure(text=text, text_color=color)
+
+        if lineno:
+            self.editor.tag_add(self.TAG, f"{lineno}.0", f"{lineno}.end")
+
+    def _on_destroy(self, event=None):
+        """Stop scheduling and release the worker thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._after_id is not None:
+            try:
+                self.editor.after_cancel(self._after_id)
+            except Exception:
+                pass
+        self._executor.shutdown(wait=False)
@@ -7,6 +7,12 @@ import customtkinter as ctk
 from src.ui.components import Button, Card, Badge, CodeDisplay, Alert
 from src.ui.styles import Colors, Typography, Spacing, Effects
 from src.ui.icons import Icons, IconHelper
+from src.ui.live_checker import LiveChecker
+from src.ui.async_bridge import AsyncBridge
+from src.core.validator import CodeValidator
+from src.core.mistake_rules import MistakeRuleRegistry
+from src.core.result_cache import ResultCache
+from src.core.clustering import WrongAnswerClusters
 
 
 class PracticeScreen:
@@ -271,6 +277,15 @@ class PracticeScreen:
             text_color=Colors.TEXT_PRIMARY
         ).pack(side='left')
         
+        # Live check status (filled in by LiveChecker)
+        live_status = ctk.CTkLabel(
+            editor_header,
+            text="",
+            font=(Typography.FALLBACK, Typography.CAPTION),
+            text_color=Colors.TEXT_MUTED
+        )
+        live_status.pack(side='left', padx=(Spacing.SM, 0))
+        
         # Action buttons (in header)
         btn_frame = ctk.CTkFrame(editor_header, fg_color='transparent')
         btn_frame.pack(side='right')
@@ -289,6 +304,16 @@ class PracticeScreen:
         editor.grid(row=1, column=0, sticky='ew', pady=(0, Spacing.XS))
         editor.insert('1.0', details.get('starter_code', '# Write your code here\n'))
         
+        # One validator per screen, shared by Run and the live checker
+        validator = CodeValidator(
+            mistake_rules=MistakeRuleRegistry.from_ontology(manager.get_common_mistakes()),
+            result_cache=ResultCache()
+        )
+        LiveChecker(editor, live_status, validator, details.get('concept'))
+        # Stop the validator's worker threads when the screen goes away
+        editor.bind('<Destroy>', lambda event: validator.close(), add=True)
+        clusters = WrongAnswerClusters()
+        
         # Results area - SCROLLABLE FRAME
         results_container = ctk.CTkFrame(right_col, fg_color=Colors.SURFACE, corner_radius=Effects.RADIUS_MD)
         results_container.grid(row=2, column=0, sticky='nsew')
@@ -305,30 +330,51 @@ class PracticeScreen:
         ).pack(pady=Spacing.LG)
         
         # Button handlers
-        def run_code():
-            from src.core.validator import CodeValidator
+        def run_code(profile=False):
             code = editor.get('1.0', 'end-1c')
             
             if not code.strip() or code.strip() == '# Write your code here':
                 PracticeScreen._show_message(results_area, "Write some code first!", "warning")
                 return
             
-            PracticeScreen._show_message(results_area, "Running...", "info")
-            results_area.update()
-            
             solution = manager.get_solution(problem)
             if not solution or not solution.get('code'):
                 PracticeScreen._show_message(results_area, "No solution available", "danger")
                 return
             
-            validator = CodeValidator()
-            result = validator.validate_with_test_cases(code, details, solution['code'])
+            PracticeScreen._show_message(results_area, "Running...", "info")
+            set_running(True)
+            
+            # Grade off the Tk thread so the window stays responsive
+            def on_done(result):
+                set_running(False)
+                # Keep failing attempts for instructor review
+                if clusters.add(details['name'], code, result):
+                    clusters.save()
+                PracticeScreen._show_result(
+                    results_area, result, gamification, details['name'],
+                    parent, manager, current_index, on_back, on_progress_update
+                )
+                PracticeScreen._paint_profile(editor, result.get('profile'))
+                PracticeScreen._paint_coverage(editor, result.get('coverage'))
+            
+            def on_error(error):
+                set_running(False)
+                PracticeScreen._show_message(results_area, f"Grader Error: {error}", "danger")
             
-            PracticeScreen._show_result(
-                results_area, result, gamification, details['name'],
-                parent, manager, current_index, on_back, on_progress_update
+            AsyncBridge.shared().submit(
+                results_area,
+                validator.validate_with_test_cases_async(
+                    code, details, solution['code'], profile=profile, coverage=True
+                ),
+                on_done, on_error
             )
         
+        def set_running(running):
+            state = 'disabled' if running else 'normal'
+            run_btn.configure(state=state)
+            profile_btn.configure(state=state)
+        
         def show_hint():
             if gamification:
                 gamification.record_hint_used()
@@ -357,6 +403,15 @@ class PracticeScreen:
         )
         run_btn.pack(side='left', padx=(0, Spacing.XS))
         
+        profile_btn = ctk.CTkButton(
+            btn_frame, text="⏱ Profile", command=lambda: run_code(profile=True),
+            width=65, height=28, corner_radius=6,
+            fg_color=Colors.GRAY_200, hover_color=Colors.GRAY_300,
+            text_color=Colors.TEXT_PRIMARY,
+            font=(Typography.FALLBACK, Typography.CAPTION)
+        )
+        profile_btn.pack(side='left', padx=(0, Spacing.XS))
+        
         hint_btn = ctk.CTkButton(
             btn_frame, text="Hint", command=show_hint,
             width=50, height=28, corner_radius=6,
@@ -539,6 +594,24 @@ class PracticeScreen:
                 text_color=header_color
             ).pack(anchor='w', pady=(0, Spacing.XS))
             
+            coverage = result.get('coverage')
+            if coverage:
+                summary = f"Lines run by the tests: {coverage['line_rate']}%"
+                if coverage['branch_rate'] is not None:
+                    summary += f"  ·  Branches taken: {coverage['branch_rate']}%"
+                ctk.CTkLabel(
+                    area, text=summary,
+                    font=(Typography.FALLBACK, Typography.CAPTION),
+                    text_color=Colors.TEXT_MUTED
+                ).pack(anchor='w', pady=(0, Spacing.XXS))
+                for branch in coverage['partial_branches']:
+                    ctk.CTkLabel(
+                        area, text=f"• {branch['message']}",
+                        font=(Typography.FALLBACK, Typography.CAPTION),
+                        text_color=Colors.TEXT_MUTED,
+                        wraplength=350, justify='left'
+                    ).pack(anchor='w', pady=(0, Spacing.XXS))
+            
             # Individual test results
             for test_res in result['results']:
                 is_passed = test_res['passed']
@@ -623,6 +696,10 @@ class PracticeScreen:
                     text_color=Colors.SUCCESS_DARK if is_passed else Colors.DANGER
                 ).pack(side='left', padx=(Spacing.XS, 0))
                 
+                # Line diff (failing tests only)
+                if test_res.get('diff') and test_res['diff']['entries']:
+                    PracticeScreen._show_diff(details_frame, test_res['diff'])
+                
                 # Error row (if any)
                 if test_res.get('error'):
                     error_row = ctk.CTkFrame(details_frame, fg_color='transparent')
@@ -644,6 +721,32 @@ class PracticeScreen:
                         text_color=Colors.DANGER
                     ).pack(side='left', padx=(Spacing.XS, 0))
         
+        # ============================================
+        # LINE PROFILE (only for profiled runs)
+        # ============================================
+        profile = result.get('profile')
+        if profile:
+            profile_frame = ctk.CTkFrame(area, fg_color=Colors.GRAY_50, corner_radius=8)
+            profile_frame.pack(fill='x', pady=(Spacing.XS, 0))
+            
+            profile_content = ctk.CTkFrame(profile_frame, fg_color='transparent')
+            profile_content.pack(fill='x', padx=Spacing.SM, pady=Spacing.SM)
+            
+            ctk.CTkLabel(
+                profile_content, text="⏱ Hottest Lines",
+                font=(Typography.FALLBACK, Typography.CAPTION, 'bold'),
+                text_color=Colors.TEXT_MUTED
+            ).pack(anchor='w')
+            
+            hottest = sorted(profile.items(), key=lambda item: item[1]['time'], reverse=True)[:3]
+            for lineno, stats in hottest:
+                ctk.CTkLabel(
+                    profile_content,
+                    text=f"Line {lineno}: {stats['hits']} hits · {stats['time'] * 1000:.2f} ms",
+                    font=(Typography.MONO_FALLBACK, 11),
+                    text_color=Colors.TEXT_SECONDARY
+                ).pack(anchor='w', pady=(Spacing.XXS, 0))
+        
         # ============================================
         # DETECTED MISTAKES (from validator)
         # ============================================
@@ -682,6 +785,83 @@ class PracticeScreen:
                     wraplength=350, justify='left'
                 ).pack(anchor='w', pady=(Spacing.XXS, 0))
     
+    @staticmethod
+    def _show_diff(parent, diff):
+        """Render a test's line diff: '-' expected lines, '+' lines the code printed"""
+        frame = ctk.CTkFrame(parent, fg_color=Colors.GRAY_50, corner_radius=6)
+        frame.pack(fill='x', pady=(Spacing.XS, 0))
+        
+        ctk.CTkLabel(
+            frame, text="- expected    + your output",
+            font=(Typography.FALLBACK, Typography.TINY),
+            text_color=Colors.TEXT_MUTED, anchor='w'
+        ).pack(fill='x', padx=Spacing.SM, pady=(Spacing.XXS, 0))
+        
+        for entry in diff['entries']:
+            op = entry['op']
+            if op == 'skip':
+                rows = [(f"      ... {entry['count']} matching lines ...", Colors.TEXT_MUTED)]
+            elif op == 'equal':
+                rows = [(f"{entry['expected_line']:>4}   {entry['expected']}", Colors.TEXT_SECONDARY)]
+            elif op == 'missing':
+                rows = [(f"{entry['expected_line']:>4} - {entry['expected']}", Colors.SUCCESS_DARK)]
+            elif op == 'extra':
+                rows = [(f"{entry['actual_line']:>4} + {entry['actual']}", Colors.DANGER)]
+            else:
+                rows = [
+                    (f"{entry['expected_line']:>4} - {entry['expected']}", Colors.SUCCESS_DARK),
+                    (f"{entry['actual_line']:>4} + {entry['actual']}", Colors.DANGER),
+                    # Caret under the first differing character
+                    (" " * (6 + entry['column']) + "^", Colors.DANGER)
+                ]
+            for text, color in rows:
+                ctk.CTkLabel(
+                    frame, text=text,
+                    font=(Typography.MONO_FALLBACK, 11),
+                    text_color=color, anchor='w', justify='left'
+                ).pack(fill='x', padx=Spacing.SM)
+        
+        if diff['truncated']:
+            ctk.CTkLabel(
+                frame, text="(output too long - showing the first differences)",
+                font=(Typography.FALLBACK, Typography.TINY),
+                text_color=Colors.TEXT_MUTED, anchor='w'
+            ).pack(fill='x', padx=Spacing.SM, pady=(0, Spacing.XXS))
+    
+    @staticmethod
+    def _paint_profile(editor, profile):
+        """Shade editor lines by the time they took (clears the heat map when profile is None)"""
+        levels = len(Colors.HEAT)
+        for level in range(levels):
+            editor.tag_remove(f'heat{level}', '1.0', 'end')
+        
+        if not profile:
+            return
+        
+        max_time = max(stats['time'] for stats in profile.values())
+        if max_time <= 0:
+            return
+        
+        for lineno, stats in profile.items():
+            level = min(int(stats['time'] / max_time * levels), levels - 1)
+            tag = f'heat{level}'
+            editor.tag_config(tag, background=Colors.HEAT[level])
+            editor.tag_add(tag, f"{lineno}.0", f"{lineno}.end")
+    
+    @staticmethod
+    def _paint_coverage(editor, coverage):
+        """Shade the lines no test ran (clears the shading when coverage is None)"""
+        editor.tag_remove('uncovered', '1.0', 'end')
+        
+        if not coverage:
+            return
+        
+        editor.tag_config('uncovered', background=Colors.UNCOVERED)
+        for lineno in coverage['missing_lines']:
+            editor.tag_add('uncovered', f"{lineno}.0", f"{lineno}.end")
+        # The profiler's heat map wins where both apply
+        editor.tag_lower('uncovered')
+    
     @staticmethod
     def _show_level_up_popup(parent, old_level, new_level, current_xp):
         """Show compact level up popup"""
@@ -60,6 +60,12 @@ class Colors:
     # Code
     CODE_BG = '#1e1e1e'
     CODE_TEXT = '#d4d4d4'
+    
+    # Profiler heat map on the code editor (cool -> hot)
+    HEAT = ['#2d3a2e', '#4a4319', '#5e3413', '#7a1f1f']
+    
+    # Lines no test ran
+    UNCOVERED = '#3a3a3a'
     WHITE = '#ffffff'
 
 